@@ -0,0 +1,44 @@
+# FSCS single customer view (SCV) and exclusions view (EX) file validation.
+#
+# validate_file() and its streaming, failures-only and incremental variants
+# take a profile naming the rule set to apply; run_directory() validates a
+# whole folder of files in parallel.
+from .columnar import ErrorMasks, FailureReport, validate_columns
+from .customers import COMPENSATION_LIMIT, aggregate_customers
+from .duplicate_index import DuplicateIndex
+from .error_codes import (
+    ERROR_CODES, ERROR_MESSAGES, error_code, error_message, register_error_message,
+)
+from .hierarchy import PRODUCT_HIERARCHY, ProductHierarchy
+from .patterns import VALIDATORS, Validator, get_validator, register_validator
+from .pipeline import (
+    check_footer, customer_summary, iter_file_errors, load_rules, quick_check_file,
+    reconcile_file, report_cross_file_duplicates, run_directory, validate_file,
+    validate_file_errors, validate_file_incremental, validate_file_streaming,
+)
+from .profiles import PROFILES, Profile, get_profile, register_profile
+from .quickcheck import QuickCheckReport
+from .readers import iter_chunks, read_input
+from .reconciliation import load_fx_rates, mismatch_summary, reconcile
+from .rules import RULES_FILE, ColumnRule, RuleSet
+from .service import ValidationService, submit
+from .store import amounts_in_pence
+from .structure import FileStructureError, check_structure
+from .timing import Timings
+from .watcher import FolderWatcher, watch_directory
+from .writers import LAYOUTS, format_output, open_sink, open_writer
+
+__all__ = [
+    "COMPENSATION_LIMIT", "ColumnRule", "DuplicateIndex", "ERROR_CODES", "ERROR_MESSAGES",
+    "ErrorMasks", "FailureReport", "FileStructureError", "FolderWatcher", "LAYOUTS",
+    "PRODUCT_HIERARCHY", "PROFILES", "ProductHierarchy", "Profile", "QuickCheckReport",
+    "RULES_FILE", "RuleSet", "Timings", "VALIDATORS", "ValidationService", "Validator",
+    "aggregate_customers", "amounts_in_pence", "check_footer", "check_structure",
+    "customer_summary", "error_code", "error_message", "format_output", "get_profile",
+    "get_validator", "iter_chunks", "iter_file_errors", "load_fx_rates", "load_rules",
+    "mismatch_summary", "open_sink", "open_writer", "quick_check_file", "read_input",
+    "reconcile", "reconcile_file", "register_error_message", "register_profile",
+    "register_validator", "run_directory", "submit", "validate_columns", "validate_file",
+    "validate_file_errors", "validate_file_incremental", "validate_file_streaming",
+    "watch_directory",
+]
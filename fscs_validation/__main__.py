@@ -0,0 +1,58 @@
+# python -m fscs_validation <folder> [--profile batch2] [--output results/]
+import argparse
+import os
+
+from .pipeline import quick_check_directory, run_directory
+from .profiles import PROFILE_ALIASES, PROFILES
+from .quickcheck import ERROR_BUDGET, SAMPLE_ROWS
+from .rules import RULES_FILE
+from .watcher import watch_directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fscs_validation",
+                                     description="Validate a folder of FSCS SCV/EX files")
+    parser.add_argument("input_dir")
+    parser.add_argument("--output", dest="output_dir",
+                        help="folder for the -result.xlsx files (default: the input folder)")
+    parser.add_argument("--profile", default="batch",
+                        choices=sorted(PROFILES) + sorted(PROFILE_ALIASES))
+    parser.add_argument("--rules", default=RULES_FILE, help="rules workbook")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per CPU)")
+    parser.add_argument("--incremental", action="store_true",
+                        default=bool(os.environ.get("FSCS_INCREMENTAL")),
+                        help="only re-run rows changed since the last run")
+    parser.add_argument("--cross-file", action="store_true",
+                        help="also report duplicates between files in the folder")
+    parser.add_argument("--timings", action="store_true",
+                        help="save per-phase and per-rule timings beside each result")
+    parser.add_argument("--customers", action="store_true",
+                        help="save each file's per-customer totals beside its results")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running, validating new and changed files as they arrive "
+                             "(results go to <input_dir>/results unless --output is given)")
+    parser.add_argument("--quick", action="store_true",
+                        help="only check each file's header and a random sample of its rows, "
+                             "writing no results")
+    parser.add_argument("--sample", type=int, default=SAMPLE_ROWS,
+                        help="rows to sample per file with --quick")
+    parser.add_argument("--error-budget", type=float, default=ERROR_BUDGET,
+                        help="share of rows with a failing cell above which --quick stops and "
+                             "fails a file")
+    args = parser.parse_args(argv)
+    if args.quick:
+        reports = quick_check_directory(args.input_dir, args.profile, args.rules, args.sample,
+                                        args.error_budget)
+        return 0 if all(report.ok for report in reports) else 1
+    if args.watch:
+        watch_directory(args.input_dir, args.output_dir, args.profile, args.rules,
+                        args.workers, args.incremental)
+        return 0
+    summary = run_directory(args.input_dir, args.output_dir, args.profile, args.rules,
+                            args.incremental, args.workers, args.cross_file, args.timings,
+                            args.customers)
+    return 0 if all(status["status"] == "success" for status in summary) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
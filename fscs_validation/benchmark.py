@@ -0,0 +1,122 @@
+# Benchmarks of validate_file on synthetic SCV/EX files.
+#
+# python -m fscs_validation.benchmark --rows 1000 100000 --inputs csv xlsx --outputs xlsx csv
+#
+# Every combination of row count, input format, output format and SCV/EX
+# file is generated once (seeded, so runs are comparable), validated end to
+# end with phase timings, and appended as one JSON line to the results
+# file, tagged with a run id and the git commit. --compare prints the last
+# two runs side by side.
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .pipeline import load_rules, validate_file_streaming
+from .rules import RULES_FILE
+from .synthetic import file_name, generate_frame, write_file
+from .timing import Timings
+from .writers import EXCEL_MAX_ROWS
+
+RESULTS_FILE = "benchmark-results.jsonl"
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(rules_path=RULES_FILE, rows=(1000,), inputs=("csv",), outputs=("xlsx",),
+                  profile="batch2", error_rate=0.01, duplicate_rate=0.001, seed=0,
+                  results_path=RESULTS_FILE, work_dir=None):
+    """Time every combination; returns the result records, also appended to results_path"""
+    run = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    commit = _commit()
+    rules = load_rules(rules_path)
+    records = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for count in rows:
+            for exclusion in (False, True):
+                frame = generate_frame(rules, count, exclusion, error_rate, duplicate_rate,
+                                       seed=seed)
+                for input_format in inputs:
+                    if input_format == "xlsx" and count >= EXCEL_MAX_ROWS:
+                        print(f"Skipping {count} rows as xlsx input: too many for one sheet")
+                        continue
+                    input_path = write_file(frame, os.path.join(
+                        tmp, file_name(0, exclusion, "." + input_format)))
+                    for output_format in outputs:
+                        output_path = os.path.join(tmp, f"result.{output_format}")
+                        timings = Timings()
+                        started = time.perf_counter()
+                        with timings.activate():
+                            validate_file_streaming(input_path, rules, output_path, profile)
+                        seconds = time.perf_counter() - started
+                        record = {
+                            "run": run, "commit": commit, "profile": profile,
+                            "rows": count, "file": "EX" if exclusion else "SCV",
+                            "input": input_format, "output": output_format,
+                            "seconds": seconds, "rows_per_second": count / seconds,
+                            "phases": timings.phases,
+                        }
+                        records.append(record)
+                        print(f"{count:>9} {record['file']:<4} {input_format:>5} -> "
+                              f"{output_format:<8} {seconds:8.2f}s "
+                              f"{record['rows_per_second']:>10.0f} rows/s")
+    with open(results_path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return records
+
+
+def compare_runs(results_path=RESULTS_FILE):
+    """Print the last two runs in results_path side by side"""
+    with open(results_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    runs = sorted({record["run"] for record in records})
+    if len(runs) < 2:
+        print("Need at least two runs to compare")
+        return
+    before, after = ({(r["rows"], r["file"], r["input"], r["output"]): r["seconds"]
+                      for r in records if r["run"] == run} for run in runs[-2:])
+    print(f"{'rows':>9} {'file':<4} {'input':>5} -> {'output':<8} "
+          f"{runs[-2]:>17} {runs[-1]:>17} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        count, kind, input_format, output_format = key
+        change = after[key] / before[key] - 1
+        print(f"{count:>9} {kind:<4} {input_format:>5} -> {output_format:<8} "
+              f"{before[key]:16.2f}s {after[key]:16.2f}s {change:+8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fscs_validation.benchmark",
+                                     description="Time validation of synthetic SCV/EX files")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--inputs", nargs="+", default=["csv"], choices=["csv", "psv", "xlsx"])
+    parser.add_argument("--outputs", nargs="+", default=["xlsx"],
+                        choices=["xlsx", "csv", "parquet"])
+    parser.add_argument("--profile", default="batch2")
+    parser.add_argument("--rules", default=RULES_FILE, help="rules workbook")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSON lines file to append to")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare the last two runs in the results file and exit")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare_runs(args.results)
+        return 0
+    run_benchmark(args.rules, args.rows, args.inputs, args.outputs, args.profile,
+                  args.error_rate, args.duplicate_rate, args.seed, args.results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
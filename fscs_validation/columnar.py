@@ -0,0 +1,866 @@
+# Column-at-a-time validation engine.
+#
+# Finds exactly the failures the per-cell loops the validator scripts used
+# to run did, but runs every rule once per column with pandas string
+# accessors and isna masks instead of walking the frame with iterrows.
+# Failures come back as ErrorMasks, one bitmask of error codes per cell; the
+# writers render them as the "Pass" / "Fail - ..." strings of the original
+# output. CHECKS maps each profile name to the function that applies its
+# rules to one column; see profiles.py. The one deliberate difference is the
+# product hierarchy check (hierarchy.py), which reports a single violation
+# naming the outranking product instead of one message per higher-priority
+# product seen.
+import time
+
+import numpy as np
+import pandas as pd
+
+from .customers import (
+    COMPENSATION_LIMIT, CUSTOMER_KEY, aggregate_customers, customer_keys, over_limit_customers,
+)
+from .error_codes import code_bit, error_code, error_message, mask_words, word_codes
+from .hierarchy import PRODUCT_HIERARCHY, PRODUCTS_BY_PRIORITY, ProductHierarchy, violation_message
+from .patterns import get_validator, match_all, per_value
+from .reconciliation import reconcile
+from .timing import active as active_timings
+
+# Bump whenever a change to the checks changes what they report, so results
+# cached by earlier versions (incremental.py) are not reused
+ENGINE_VERSION = 2
+
+PRODUCT_TYPES = {'IAA', 'ISA', 'NA', 'FD1', 'FD2', 'FD4', 'Other'}
+EXTENDED_PRODUCT_TYPES = PRODUCT_TYPES | {'FP4P'}
+EXCLUSION_TYPES = {'HMTS', 'LEGDIS', 'LEGDOR', 'BEN'}
+
+NUMERIC_FIELDS = ("sort_code", "account_holder_indicator",
+                  "account_balance_in_sterling", "authorised_negative_balances",
+                  "account_balance_in_original_currency",
+                  "exchange_rate", "original_account_balance_before_interest")
+
+# Address lines that become mandatory once a higher line is populated
+ADDRESS_FOLLOWERS = {
+    "address_line_3": (("address_line_4", "address_line_5", "address_line_6"),
+                       "Mandatory if address_line_4 or address_line_5 is populated"),
+    "address_line_4": (("address_line_5", "address_line_6"),
+                       "Mandatory if address_line_5 or address_line_6 is populated"),
+    "address_line_5": (("address_line_6",),
+                       "Mandatory if address_line_6 is populated"),
+}
+
+
+def _text(values):
+    """str(value) for every populated cell and "" for missing ones"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Each category is converted once; the missing code (-1) picks the
+        # trailing ""
+        categories = _text(pd.Series(values.cat.categories)).to_numpy()
+        text = np.append(categories, "")[values.cat.codes.to_numpy()]
+    else:
+        text = values.astype("string").fillna("").to_numpy(dtype=object)
+    return pd.Series(text, index=values.index, dtype=object)
+
+
+def _floats(values):
+    """float() of every value, raising exactly as the row loops did"""
+    return np.array([float(v) for v in values], dtype=float)
+
+
+def _lenient_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _numeric_field_error(name, value, max_length):
+    """The single error the numeric-field block reports for one value"""
+    try:
+        if name == "sort_code":
+            # Force numeric conversion to handle "text formatted numbers"
+            if len(str(int(float(str(value).strip())))) > 6:
+                return "Exceeds Max Length"
+        else:
+            str_val = str(pd.to_numeric(str(value).strip()))
+            if max_length and len(str_val.replace(" ", "").replace("-", "")) > max_length:
+                return "Exceeds Max Length"
+    except Exception:
+        return "Invalid Numeric Format"
+    return None
+
+
+def _contains(text, *keywords):
+    found = np.zeros(len(text), dtype=bool)
+    for keyword in keywords:
+        found |= text.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+    return found
+
+
+class ValidationState:
+    """Cross-row memory (duplicate keys, products seen) shared between calls
+
+    *customers_over_limit* are the customers whose accounts across the whole
+    file exceed the compensation limit; without it, each frame validated is
+    taken to be a whole file.
+    """
+
+    def __init__(self, customers_over_limit=None):
+        self.seen = {}
+        self.products = ProductHierarchy()
+        self.customers_over_limit = customers_over_limit
+
+    def duplicated(self, kind, keys):
+        """Flag keys already seen, earlier in *keys* or in a previous call
+
+        Each key is looked up in the set of keys seen so far, so a call costs
+        the same however many calls came before it (isin() would rebuild a
+        hash table of the whole set every time).
+        """
+        seen = self.seen.setdefault(kind, set())
+        values = keys.to_numpy(dtype=object)
+        repeated = keys.duplicated().to_numpy() | np.fromiter(
+            (value in seen for value in values), dtype=bool, count=len(values))
+        seen.update(values[~repeated])
+        return repeated
+
+    def outranked(self, priorities):
+        """Per row, the priority of an earlier product that outranks it, else 0"""
+        return self.products.outranked(priorities.to_numpy())
+
+    def over_limit(self, keys, frame):
+        """Per customer key, whether that customer is over the compensation limit"""
+        customers = self.customers_over_limit
+        if customers is None:
+            customers = over_limit_customers(aggregate_customers([frame]))
+        return keys.isin(customers).to_numpy()
+
+
+class FrameContext:
+    """Row-level facts several column checks depend on"""
+
+    def __init__(self, frame, state, is_exclusion_file=False, type_checks=None):
+        self.frame = frame
+        self.state = state
+        self.is_exclusion_file = is_exclusion_file
+        # The profile's check for each "Type of data"
+        self.type_checks = type_checks if type_checks is not None else {}
+        self.individual = self.present("title")
+        self._upper = {}
+
+    def present(self, name):
+        # row.get() on a missing column returns None, which is never populated
+        if name not in self.frame.columns:
+            return np.zeros(len(self.frame), dtype=bool)
+        return self.frame[name].notna().to_numpy()
+
+    def objects(self, name, default=None):
+        if name not in self.frame.columns:
+            return pd.Series(default, index=self.frame.index, dtype=object)
+        return self.frame[name].astype(object)
+
+    def upper(self, name):
+        if name not in self._upper:
+            if name in self.frame.columns:
+                self._upper[name] = _text(self.frame[name]).str.upper()
+            else:
+                self._upper[name] = pd.Series("", index=self.frame.index, dtype=object)
+        return self._upper[name]
+
+    def duplicated(self, kind, keys, mask=None):
+        """Full-length duplicate flags for the rows selected by *mask*"""
+        if mask is None:
+            return self.state.duplicated(kind, keys)
+        repeated = np.zeros(len(mask), dtype=bool)
+        repeated[mask] = self.state.duplicated(kind, keys[mask])
+        return repeated
+
+    def over_limit(self, mask):
+        """Whether the customer of each row selected by *mask* is over the limit"""
+        over = np.zeros(len(mask), dtype=bool)
+        keys = customer_keys(self.frame[CUSTOMER_KEY][mask])
+        over[mask] = self.state.over_limit(keys, self.frame)
+        return over
+
+
+def _widen(masks, words):
+    """*masks* with zero words added up to *words* words per row"""
+    if masks.shape[1] >= words:
+        return masks
+    return np.pad(masks, ((0, 0), (0, words - masks.shape[1])))
+
+
+def decode_masks(masks, repeated=None, order=()):
+    """Row positions and error code lists of the failing cells of one column
+
+    *order* is the column's codes in check order; each cell's codes are
+    listed in that order, a code in *repeated* twice.
+    """
+    rank = {code: i for i, code in enumerate(order)}
+    if repeated is None:
+        repeated = np.zeros_like(masks)
+    rows = np.flatnonzero(masks.any(axis=1))
+    cells = np.ascontiguousarray(np.hstack([masks[rows], _widen(repeated, masks.shape[1])[rows]]))
+    # One opaque value per row, so np.unique() compares whole rows at once
+    keys = cells.view(np.dtype((np.void, cells.itemsize * cells.shape[1]))).reshape(-1)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    uniques = cells[first]
+    words = masks.shape[1]
+    decoded = []
+    for unique in uniques:
+        twice = {code for word, value in enumerate(unique[words:])
+                 for code in word_codes(word, value)}
+        codes = sorted((code for word, value in enumerate(unique[:words])
+                        for code in word_codes(word, value)),
+                       key=lambda code: rank.get(code, len(rank) + code))
+        decoded.append([repeat for code in codes for repeat in [code] * (1 + (code in twice))])
+    return rows, [decoded[i] for i in inverse.reshape(-1)]
+
+
+class ColumnCheck:
+    """Accumulates the failures of one column, as one error bitmask per cell
+
+    The mask of a cell has the bit of every error code it failed with (see
+    error_codes.code_bit); a code raised for a cell a second time (some
+    numeric fields run the numeric-format check twice) is also set in
+    repeated. order records the column's codes in the order its checks ran,
+    which is the order a cell's messages are written in.
+    """
+
+    def __init__(self, frame, name, rule):
+        self.name = name
+        self.values = frame[name]
+        self.present = self.values.notna().to_numpy()
+        self.missing = ~self.present
+        self.text = _text(self.values)
+        self.max_length = rule.max_length
+        self.data_type = rule.data_type
+        # The validator of a type declared in the rules sheet
+        self.declared = rule.declared
+        self.rule_mandatory = rule.mandatory
+        self.mandatory = np.full(len(frame), self.rule_mandatory)
+        self._upper = None
+        self.order = []
+        self.masks = np.zeros((len(frame), mask_words()), dtype=np.uint64)
+        self.repeated = None
+        self._timings = active_timings()
+        if self._timings is not None:
+            self._checkpoint = time.perf_counter()
+
+    @property
+    def upper(self):
+        if self._upper is None:
+            self._upper = self.text.str.upper()
+        return self._upper
+
+    def fail(self, mask, message):
+        mask = np.asarray(mask, dtype=bool)
+        if self._timings is not None:
+            now = time.perf_counter()
+            self._timings.rule(self.name, message, now - self._checkpoint, int(mask.sum()))
+            self._checkpoint = now
+        code = error_code(message)
+        # Every check is recorded, failing or not, so the order does not
+        # depend on which rows a chunk happens to hold
+        if code not in self.order:
+            self.order.append(code)
+        if not mask.any():
+            return
+        word, bit = code_bit(code)
+        self.masks = _widen(self.masks, word + 1)
+        again = mask & ((self.masks[:, word] & bit) != 0)
+        if again.any():
+            if self.repeated is None:
+                self.repeated = np.zeros_like(self.masks)
+            self.repeated = _widen(self.repeated, word + 1)
+            self.repeated[again, word] |= bit
+        self.masks[mask, word] |= bit
+
+    def failing(self):
+        return self.masks.any(axis=1)
+
+    def failed(self, message):
+        """Cells already failed with *message*"""
+        word, bit = code_bit(error_code(message))
+        if word >= self.masks.shape[1]:
+            return np.zeros(len(self.masks), dtype=bool)
+        return (self.masks[:, word] & bit) != 0
+
+    def error_codes(self):
+        """Error code list of every failing cell, as (row positions, code lists)"""
+        return decode_masks(self.masks, self.repeated, self.order)
+
+
+class ErrorMasks:
+    """Validation results of a frame, as one error bitmask per cell
+
+    masks holds a (rows, words) uint64 array for each validated column of
+    columns; bit c % 64 of word c // 64 is set for a cell that failed with
+    error code c. Codes a cell failed with twice are set in repeated as well,
+    which only has the columns where that happened. order lists each
+    column's codes in check order. Columns without a rule are not validated
+    and have no masks. Messages are only rendered by the writers.
+    """
+
+    def __init__(self, index, columns, masks, order, repeated=None):
+        self.index = index
+        self.columns = list(columns)
+        self.masks = masks
+        self.order = order
+        self.repeated = repeated if repeated is not None else {}
+
+    @classmethod
+    def from_checks(cls, index, columns, checks):
+        """Results of finished ColumnChecks, for frame *index* and *columns*"""
+        return cls(index, columns,
+                   {check.name: check.masks for check in checks},
+                   {check.name: check.order for check in checks},
+                   {check.name: check.repeated for check in checks
+                    if check.repeated is not None})
+
+    def __len__(self):
+        return len(self.index)
+
+    def validated(self, name):
+        return name in self.masks
+
+    def failing(self, name):
+        return self.masks[name].any(axis=1)
+
+    def error_codes(self, name):
+        """(row positions, code lists) of the failing cells of column *name*"""
+        return decode_masks(self.masks[name], self.repeated.get(name),
+                            self.order.get(name, ()))
+
+    @classmethod
+    def concat(cls, parts):
+        """One ErrorMasks of the rows of every part, in order"""
+        parts = list(parts)
+        first = parts[0]
+        masks, repeated, order = {}, {}, {}
+        for name in first.masks:
+            words = max(part.masks[name].shape[1] for part in parts)
+            masks[name] = np.vstack([_widen(part.masks[name], words) for part in parts])
+            if any(name in part.repeated for part in parts):
+                repeated[name] = np.vstack([
+                    _widen(part.repeated.get(name, np.zeros_like(part.masks[name])), words)
+                    for part in parts])
+            order[name] = list(dict.fromkeys(code for part in parts
+                                             for code in part.order.get(name, ())))
+        index = first.index.append([part.index for part in parts[1:]])
+        return cls(index, first.columns, masks, order, repeated)
+
+    def take(self, positions):
+        """The results of the rows at *positions*"""
+        return ErrorMasks(self.index[positions], self.columns,
+                          {name: masks[positions] for name, masks in self.masks.items()},
+                          self.order,
+                          {name: masks[positions] for name, masks in self.repeated.items()})
+
+    def reindex(self, index):
+        """The results in the row order of *index*, which must hold only known rows"""
+        return self.take(self.index.get_indexer(index))
+
+    def update(self, other):
+        """Overwrite, in place, the rows and columns *other* has results for"""
+        positions = self.index.get_indexer(other.index)
+        for name, masks in other.masks.items():
+            words = max(masks.shape[1], self.masks[name].shape[1])
+            self.masks[name] = _widen(self.masks[name], words)
+            self.masks[name][positions] = _widen(masks, words)
+            if name in other.repeated or name in self.repeated:
+                repeated = self.repeated.get(name, np.zeros_like(self.masks[name]))
+                repeated = _widen(repeated, words)
+                repeated[positions] = _widen(other.repeated.get(name, np.zeros_like(masks)),
+                                             words)
+                self.repeated[name] = repeated
+        return self
+
+    def to_frame(self):
+        """The masks as uint64 columns "<column>:<word>" (and ":<word>:repeated")"""
+        columns = {}
+        for name, masks in self.masks.items():
+            for word in range(masks.shape[1]):
+                columns[f"{name}:{word}"] = masks[:, word]
+            if name in self.repeated:
+                for word in range(self.repeated[name].shape[1]):
+                    columns[f"{name}:{word}:repeated"] = self.repeated[name][:, word]
+        return pd.DataFrame(columns, index=self.index)
+
+    @classmethod
+    def from_frame(cls, frame, columns, order):
+        """Read back to_frame() output for the frame *columns*, with each column's *order*"""
+        masks, repeated = {}, {}
+        for name in columns:
+            if f"{name}:0" not in frame.columns:
+                continue
+            for layer, suffix in ((masks, ""), (repeated, ":repeated")):
+                words = []
+                while f"{name}:{len(words)}{suffix}" in frame.columns:
+                    words.append(frame[f"{name}:{len(words)}{suffix}"].to_numpy(dtype=np.uint64))
+                if words:
+                    layer[name] = np.column_stack(words)
+        return cls(frame.index, columns, masks, dict(order), repeated)
+
+
+def _valid(values, data_type):
+    """patterns.VALIDATORS[data_type] over *values*; missing values pass, as
+    the scalar validators of the original scripts had them do
+    """
+    return get_validator(data_type).check_series(values)
+
+
+def _type_check(data_type):
+    def check_type(check):
+        return _valid(check.values, data_type)
+    return check_type
+
+
+def _type_checks(alphanumeric):
+    """Vectorized "Type of data" checks, checking AlphaNumeric with the
+    *alphanumeric* validator
+    """
+    return {
+        'AlphaNumeric': _type_check(alphanumeric),
+        'Alpha': _type_check('Alpha'),
+        'Numeric': _type_check('Numeric'),
+        'Decimal': _type_check('Decimal'),
+        'Email': _type_check('Email'),
+    }
+
+
+def _declared_type_check(check):
+    """Check the pattern the rules sheet declares for the column's type
+
+    It is checked alongside any check of the code's own for the type; cells
+    those already failed with the same message are not failed twice.
+    """
+    if check.declared is not None:
+        message = f"Invalid {check.data_type} Format"
+        check.fail(~check.declared.check_series(check.values) & ~check.failed(message), message)
+
+
+def _standard_checks(check, ctx, alphanumeric, numeric_fields=(),
+                     unique_scv_records=False, numeric_alphanumeric=False):
+    """Rules shared by script.py, script2.py and batch.py"""
+    name = check.name
+    present = check.present
+    type_checks = ctx.type_checks
+
+    # Account number uniqueness check
+    if name == "account_number":
+        keys = check.values.astype(object)
+        check.fail(ctx.duplicated("account_number", keys, present), "Duplicate Account Number")
+
+    if name == "product_type":
+        check.fail(present & ~check.values.isin(PRODUCT_TYPES).to_numpy(), "Invalid Product Type")
+
+    if name == "exclusion_type":
+        check.fail(present & ~check.values.isin(EXCLUSION_TYPES).to_numpy(), "Invalid Exclusion Type")
+
+    # Length validation, with special handling for SCV records and numeric fields
+    if unique_scv_records and name == "single_customer_view_record":
+        str_val = check.text.str.strip()
+        check.fail(ctx.duplicated("single_customer_view_record", str_val, present),
+                   "Duplicate SCV Record")
+        well_formed = _valid(str_val, 'Numeric') | _valid(str_val, alphanumeric)
+        check.fail(present & ~well_formed, "Invalid Format - Must be Numeric or Alphanumeric")
+        if check.max_length:
+            check.fail(present & (str_val.str.len() > check.max_length).to_numpy(),
+                       "Exceeds Max Length")
+    elif name in numeric_fields:
+        errors = np.full(len(present), None, dtype=object)
+        errors[present] = per_value(
+            lambda value: _numeric_field_error(name, value, check.max_length),
+            check.values[present], dtype=object)
+        check.fail(errors == "Exceeds Max Length", "Exceeds Max Length")
+        check.fail(errors == "Invalid Numeric Format", "Invalid Numeric Format")
+    elif check.max_length:
+        check.fail((check.text.str.len() > check.max_length).to_numpy(), "Exceeds Max Length")
+
+    # Data type validation
+    if name == "email_address":
+        # Missing emails fall through to the type check, which passes them
+        check.fail(~_valid(check.values, 'Email'), "Invalid Email Format")
+    elif name == "main_phone_number":
+        check.fail(~_valid(check.values, 'Numeric'), "Invalid Phone Number Format")
+    elif numeric_alphanumeric and check.data_type == 'AlphaNumeric':
+        # Alphanumeric fields such as account_number may also be purely numeric
+        well_formed = _valid(check.values, 'Numeric') | type_checks['AlphaNumeric'](check)
+        check.fail(~well_formed, "Invalid AlphaNumeric Format")
+    elif check.data_type in type_checks:
+        check.fail(~type_checks[check.data_type](check), f"Invalid {check.data_type} Format")
+    _declared_type_check(check)
+
+    # Individual-specific validations
+    individual = ctx.individual
+    if name in ("customer_first_forename", "other_national_identity_number"):
+        required = individual & check.missing
+        check.fail(required, "Mandatory for Individual")
+        check.mandatory &= required
+
+    if name == "other_national_identifier":
+        if "other_national_identity_number" in ctx.frame.columns:
+            provided = individual & ctx.present("other_national_identity_number")
+            check.fail(provided & check.missing,
+                       "Mandatory if other_national_identity_number is provided")
+            identifier_ok = check.values.isin(["NID", "DL", "O"]).to_numpy()
+            check.fail(provided & present & ~identifier_ok, "Invalid Identifier Type")
+            check.mandatory &= individual
+        else:
+            check.mandatory[:] = False
+
+    if name == "date_of_birth":
+        check.fail(individual & ~_valid(check.values, 'Date'), "Invalid Date Format (Should be DDMMYYYY)")
+
+    # Modified address line validations
+    if name in ADDRESS_FOLLOWERS:
+        higher_lines, message = ADDRESS_FOLLOWERS[name]
+        populated = np.zeros(len(present), dtype=bool)
+        for line in higher_lines:
+            populated |= ctx.present(line)
+        check.fail(populated & check.missing, message)
+        check.mandatory &= populated
+
+    check.fail(check.mandatory & check.missing, "Missing Mandatory Value")
+
+
+def _script_checks(check, ctx):
+    _standard_checks(check, ctx, 'StrictAlphaNumeric')
+
+
+def _script2_checks(check, ctx):
+    _standard_checks(check, ctx, 'AlphaNumeric',
+                     numeric_fields=NUMERIC_FIELDS + ("single_customer_view_record",),
+                     numeric_alphanumeric=True)
+
+
+def _batch_checks(check, ctx):
+    _standard_checks(check, ctx, 'AlphaNumeric',
+                     numeric_fields=NUMERIC_FIELDS, unique_scv_records=True,
+                     numeric_alphanumeric=True)
+
+
+def _batch2_checks(check, ctx):
+    """Rules applied by batch2.py"""
+    name = check.name
+    present = check.present
+    frame = ctx.frame
+
+    # Account number uniqueness check
+    if name == "account_number":
+        keys = check.values.astype(object)
+        check.fail(ctx.duplicated("account_number", keys, present), "Duplicate Account Number")
+
+    # THB (Temporary High Balance) validation. The limit applies per customer,
+    # to the balances of all of their accounts in the file; an account
+    # without a customer record is held to it on its own
+    if name == "account_balance_in_sterling":
+        customer = present & ctx.present(CUSTOMER_KEY)
+        balance = per_value(_lenient_float, check.values, dtype=float)
+        over = np.where(customer, ctx.over_limit(customer), balance > COMPENSATION_LIMIT)
+        check.fail(present & over, "Potential THB - Customer balances exceed compensation limit")
+
+    # Sub-fund election validation for trusts
+    if name == "account_title":
+        trust_sub = _contains(check.upper, "TRUST") & _contains(check.upper, "SUB")
+        election = _contains(check.upper, "HMRC", "ELECTION")
+        check.fail(present & trust_sub & ~election, "Trust Sub-fund without election reference")
+
+    # Junior ISA and Child Trust Fund validation
+    if name == "product_type":
+        isa = (check.values.astype(object) == "ISA").to_numpy(dtype=bool)
+        junior = _contains(ctx.upper("account_title"), "JUNIOR", "JISA", "CHILD TRUST")
+        check.fail(present & isa & junior,
+                   "Junior ISA/Child Trust Fund should be in Exclusions View")
+
+    # PO Box validation
+    if name.startswith("address_line"):
+        check.fail(present & _contains(check.upper, "PO BOX"),
+                   "PO Box address found - Verify delivery capability")
+
+    # Prison address validation
+    if name == "address_line_1":
+        prison = _contains(check.upper, "HMP", "PRISON", "CORRECTIONAL")
+        numbered = match_all(check.text, r'^[A-Z0-9]+\s')
+        check.fail(present & prison & ~numbered, "Missing prisoner number in prison address")
+
+    # Account branch jurisdiction validation
+    if name == "account_branch_jurisdiction":
+        check.fail(present & ~check.upper.isin(["GBR", "GIB"]).to_numpy(),
+                   "Invalid branch jurisdiction - Must be GBR or GIB")
+
+    # Continuity of access validation
+    if name == "product_type":
+        ranked = present & check.text.isin(PRODUCT_HIERARCHY).to_numpy()
+        priorities = check.text[ranked].map(PRODUCT_HIERARCHY)
+        eligible = np.zeros(len(present), dtype=bool)
+        candidates = ranked & ctx.present("transferable_eligible_deposit")
+        if candidates.any():
+            deposits = ctx.objects("transferable_eligible_deposit")[candidates]
+            eligible[candidates] = _floats(deposits) > 0
+        outranked_by = np.zeros(len(present), dtype=int)
+        outranked_by[ranked] = ctx.state.outranked(priorities)
+        # One violation per row, naming the product that outranks it
+        for priority in sorted(PRODUCTS_BY_PRIORITY):
+            check.fail(eligible & (outranked_by == priority),
+                       violation_message(PRODUCTS_BY_PRIORITY[priority]))
+
+    # Currency conversion validation
+    if name == "account_balance_in_sterling":
+        reconciled = reconcile(ctx.frame)
+        mismatched = reconciled.index[reconciled["mismatch"].to_numpy(dtype=bool)]
+        check.fail(ctx.frame.index.isin(mismatched), "Currency conversion mismatch")
+
+    if name.startswith('address_line_'):
+        # Address continuity check
+        line_num = int(name[-1])
+        next_line = f'address_line_{line_num + 1}'
+        if next_line in frame.columns:
+            check.fail(ctx.present(next_line) & check.missing, "Address Line Continuity Error")
+
+        if line_num == 1:
+            bfpo = _contains(check.upper, 'BFPO') & ~_valid(check.values, 'BFPO')
+            check.fail(bfpo, "Invalid BFPO Format")
+            check.fail(_contains(check.upper, 'C/O'), "Care of Address - NFFSTP")
+
+            # Duplicate address check, missing lines and postcodes included
+            postcodes = ctx.objects('postcode', default='')
+            keys = pd.Series([f"{value}_{postcode}" for value, postcode
+                              in zip(check.values.astype(object), postcodes)],
+                             index=check.values.index, dtype=object)
+            check.fail(ctx.duplicated("address", keys), "Duplicate Address")
+
+    if name in ['main_phone_number', 'evening_phone_number', 'mobile_phone_number']:
+        check.fail(~_valid(check.values, 'Phone'), "Invalid Phone Number Format")
+
+    if name == 'iban':
+        check.fail(~_valid(check.values, 'IBAN'), "Invalid IBAN Format")
+
+    if name == 'bic':
+        check.fail(~_valid(check.values, 'BIC'), "Invalid BIC Format")
+
+    if name == 'brrd_flag':
+        check.fail(present & ~check.upper.isin(['YES', 'NO']).to_numpy(), "Invalid BRRD Flag")
+
+    if name == 'structured_deposit_accounts':
+        check.fail(present & ~check.upper.isin(['YES', 'NO']).to_numpy(),
+                   "Invalid Structured Deposit Flag")
+
+    # Name validations
+    if name == 'customer_first_forename':
+        initials = np.zeros(len(present), dtype=bool)
+        initials[present] = per_value(
+            lambda value: all(len(part.strip('.')) == 1 for part in value.split()),
+            check.text[present], dtype=bool)
+        check.fail(initials, "First Name Contains Only Initials")
+        values = check.values.astype(object)
+        repeated = ((values == ctx.objects('customer_second_forename')).to_numpy(dtype=bool)
+                    | (values == ctx.objects('customer_third_forename')).to_numpy(dtype=bool))
+        check.fail(present & repeated, "Repeated Forename")
+
+    if name == 'surname':
+        check.fail(present & (check.text.str.strip().str.len() < 3).to_numpy(), "Surname Too Short")
+
+    if name == 'country':
+        check.fail(present & ~check.upper.isin(['GBR', 'GIB']).to_numpy(), "Invalid Country Code")
+
+    # ASCII range validation for all fields
+    check.fail(~_valid(check.values, 'ASCII'), "Invalid Characters Outside ASCII Range")
+
+    _declared_type_check(check)
+
+
+def _batch3_checks(check, ctx):
+    """Rules applied by batch3-fscs-ex-guide.py to SCV and exclusion files"""
+    name = check.name
+    present = check.present
+    missing = check.missing
+
+    if name == 'sort_code':
+        check.fail(~_valid(check.values, 'Numeric'), "Invalid Sort Code Format")
+
+    # Conditional mandatory checks
+    if name == 'customer_second_forename':
+        check.fail(ctx.present('customer_third_forename') & missing,
+                   "Mandatory when third forename is present")
+
+    if name.startswith('address_line_'):
+        line_num = int(name[-1])
+        later = np.zeros(len(present), dtype=bool)
+        for next_line in range(line_num + 1, 7):
+            later |= ctx.present(f'address_line_{next_line}')
+        check.fail(later & missing,
+                   f"Mandatory when address line {line_num + 1} or higher is populated")
+
+        # Care of address check
+        if line_num == 1:
+            check.fail(_contains(check.upper, 'C/O'), "Care of Address - NFFSTP")
+
+    if name == 'product_type':
+        check.fail(present & ~check.text.isin(EXTENDED_PRODUCT_TYPES).to_numpy(),
+                   "Invalid product type")
+
+    if name == "account_branch_jurisdiction":
+        check.fail(present & ~check.upper.isin(["GBR", "GIB"]).to_numpy(),
+                   "Invalid branch jurisdiction - Must be GBR or GIB")
+
+    if name == 'compensatable_amount' and check.rule_mandatory:
+        not_ben = (ctx.upper('exclusion_type') != 'BEN').to_numpy()
+        check.fail(not_ben & missing, "Mandatory unless exclusion_type is BEN")
+
+    if name == 'bank_recovery_and_resolution_marking':
+        if not ctx.is_exclusion_file:
+            check.fail(missing, "Mandatory for non-exclusive files")
+        check.fail(present & ~check.upper.isin(['YES', 'NO']).to_numpy(),
+                   "Invalid value. Must be YES or NO")
+
+    if name == 'exclusion_type' and ctx.is_exclusion_file:
+        check.fail(missing, "Exclusion Type is mandatory for exclusion files")
+        check.fail(present & ~check.upper.isin(EXCLUSION_TYPES).to_numpy(), "Invalid Exclusion Type")
+
+    _declared_type_check(check)
+
+
+# "Type of data" checks of each profile, by name; profiles.register_profile()
+# adds more. script keeps the strict AlphaNumeric rule of the original
+# notebook; batch2 and batch3 never checked types generically.
+EXTENDED_TYPE_CHECKS = _type_checks('AlphaNumeric')
+TYPE_CHECKS = {
+    "script": _type_checks('StrictAlphaNumeric'),
+    "script2": EXTENDED_TYPE_CHECKS,
+    "batch": EXTENDED_TYPE_CHECKS,
+    "batch2": {},
+    "batch3": {},
+}
+
+# Column checks of each profile, by name; profiles.register_profile() adds more
+CHECKS = {
+    "script": _script_checks,
+    "script2": _script2_checks,
+    "batch": _batch_checks,
+    "batch2": _batch2_checks,
+    "batch3": _batch3_checks,
+}
+
+
+def _run_checks(frame, rules, profile, state, is_exclusion_file, columns=None):
+    """Yield (column name, finished ColumnCheck or None when it has no rule)"""
+    checks = CHECKS[profile]
+    ctx = FrameContext(frame, state if state is not None else ValidationState(),
+                       is_exclusion_file, TYPE_CHECKS[profile])
+    columns = frame.columns if columns is None else [c for c in frame.columns if c in columns]
+    for col_name in columns:
+        rule = rules.get(col_name)
+        if rule is None:
+            yield col_name, None
+            continue
+        started = time.perf_counter()
+        check = ColumnCheck(frame, col_name, rule)
+        checks(check, ctx)
+        if check._timings is not None:
+            check._timings.column(col_name, time.perf_counter() - started,
+                                  int(check.failing().sum()))
+        yield col_name, check
+
+
+def validate_columns(frame, rules, profile, state=None, is_exclusion_file=False,
+                     columns=None):
+    """Validate every rule column of *frame*; returns its ErrorMasks
+
+    *rules* is the RuleSet compiled once from the "Data inputs" sheet.
+    *columns* limits validation to those columns of the frame.
+    """
+    names, checks = [], []
+    for col_name, check in _run_checks(frame, rules, profile, state, is_exclusion_file, columns):
+        names.append(col_name)
+        if check is not None:
+            checks.append(check)
+    return ErrorMasks.from_checks(frame.index, names, checks)
+
+
+class FailureReport:
+    """Failing cells only, as (row, column, error codes) records
+
+    Codes are the stable ones from error_codes. Passing and unvalidated
+    cells are never stored, so a mostly clean file gives a report a few KB
+    in size.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.columns = []
+        self.errors = []
+
+    def add(self, index, check):
+        """Record the failures of one finished ColumnCheck over rows *index*"""
+        rows, cells = check.error_codes()
+        self.rows.extend(index[rows])
+        self.columns.extend([check.name] * len(rows))
+        self.errors.extend(tuple(codes) for codes in cells)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def records(self):
+        return list(zip(self.rows, self.columns, self.errors))
+
+    def to_frame(self):
+        """One row per error: row, column, code and message"""
+        cells = pd.DataFrame({"row": self.rows, "column": self.columns, "code": self.errors},
+                             dtype=object)
+        errors = cells.explode("code", ignore_index=True).dropna(subset=["code"])
+        errors["code"] = errors["code"].astype(int)
+        errors["error"] = errors["code"].map(error_message).astype(object)
+        return errors
+
+    def column_counts(self):
+        """Failing cells per column"""
+        return pd.Series(self.columns, dtype=object).value_counts()
+
+    def error_counts(self):
+        """Occurrences of each error message"""
+        return self.to_frame()["error"].value_counts()
+
+
+def validate_failures(frame, rules, profile, state=None, is_exclusion_file=False, report=None):
+    """Like validate_columns, but only failures are kept, in a FailureReport
+
+    Pass the same *report* (and *state*) for each chunk of a file to collect
+    the whole file's failures in one report.
+    """
+    report = report if report is not None else FailureReport()
+    for _, check in _run_checks(frame, rules, profile, state, is_exclusion_file):
+        if check is not None:
+            report.add(frame.index, check)
+    return report
+
+
+def validate_chunks(chunks, rules, profile, is_exclusion_file=False,
+                    customers_over_limit=None):
+    """Validate a file chunk by chunk, yielding each (chunk, ErrorMasks) pair
+
+    Duplicate and product-hierarchy state carries across chunks, so a repeat
+    is still caught when its first occurrence was in an earlier chunk.
+    Profiles that limit balances per customer need the file's
+    *customers_over_limit*; see ValidationState.
+    """
+    state = ValidationState(customers_over_limit)
+    for chunk in chunks:
+        yield chunk, validate_columns(chunk, rules, profile, state, is_exclusion_file)
+
+
+def iter_failures(chunks, rules, profile, is_exclusion_file=False,
+                  customers_over_limit=None):
+    """Validate a file chunk by chunk, yielding each chunk's (chunk, FailureReport)"""
+    state = ValidationState(customers_over_limit)
+    for chunk in chunks:
+        yield chunk, validate_failures(chunk, rules, profile, state, is_exclusion_file)
+
+
+def collect_failures(chunks, rules, profile, is_exclusion_file=False,
+                     customers_over_limit=None):
+    """Validate a file chunk by chunk into a single FailureReport"""
+    state = ValidationState(customers_over_limit)
+    report = FailureReport()
+    for chunk in chunks:
+        validate_failures(chunk, rules, profile, state, is_exclusion_file, report)
+    return report
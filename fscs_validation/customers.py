@@ -0,0 +1,104 @@
+# Customer-level aggregation of SCV accounts.
+#
+# FSCS compensation is limited per customer, across all of their accounts,
+# not per account. Accounts are grouped on single_customer_view_record and
+# their balances summed in integer pence with a hash groupby, one chunk at a
+# time: each chunk is reduced to one row per customer before the chunks are
+# combined, so a file of millions of accounts is never held whole. batch2
+# flags the accounts of every customer whose balances add up to more than
+# the limit (see over_limit_customers).
+from decimal import ROUND_HALF_UP
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .patterns import per_value
+from .reconciliation import to_decimal
+
+COMPENSATION_LIMIT = 85000
+CUSTOMER_KEY = "single_customer_view_record"
+AMOUNT_COLUMNS = ("account_balance_in_sterling", "authorised_negative_balances",
+                  "compensatable_amount")
+CUSTOMERS_SUFFIX = ".customers.csv"
+MAX_PENCE = np.iinfo(np.int64).max
+MIN_PENCE = np.iinfo(np.int64).min
+
+
+def to_pence(value):
+    """Integer pence of a text amount, or None if it is not a finite number
+
+    Amounts too large for a 64-bit integer count as malformed too.
+    """
+    amount = to_decimal(value)
+    if amount is None:
+        return None
+    pence = int(amount.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP))
+    return pence if MIN_PENCE <= pence <= MAX_PENCE else None
+
+
+def _pence_or_zero(value):
+    return to_pence(value) or 0
+
+
+def pence(values):
+    """Integer pence of each text amount; missing and malformed amounts are 0"""
+    return per_value(_pence_or_zero, values, dtype=np.int64)
+
+
+def customers_path(output_path):
+    """Customer summary beside a result file: x-result.xlsx -> x-result.customers.csv"""
+    return Path(output_path).with_suffix(CUSTOMERS_SUFFIX)
+
+
+def customer_keys(values):
+    """The customer each single_customer_view_record value groups under"""
+    return values.astype(str).str.strip()
+
+
+def _chunk_totals(chunk):
+    customers = customer_keys(chunk[CUSTOMER_KEY])
+    amounts = pd.DataFrame({
+        column: pence(chunk[column]) if column in chunk.columns
+        else np.zeros(len(chunk), dtype=np.int64)
+        for column in AMOUNT_COLUMNS
+    }, index=chunk.index)
+    amounts["accounts"] = 1
+    return amounts.groupby(customers.to_numpy(), sort=False).sum()
+
+
+def aggregate_customers(chunks, limit=COMPENSATION_LIMIT):
+    """One summary row per customer across every chunk of a file
+
+    Columns: accounts, the summed amounts of AMOUNT_COLUMNS in pounds,
+    compensation (the compensatable amount, capped at *limit*), excess over
+    the limit and over_limit, whether the sterling balances add up to more
+    than *limit*. Accounts without a customer record are left out.
+    """
+    partials = []
+    for chunk in chunks:
+        if CUSTOMER_KEY in chunk.columns:
+            partials.append(_chunk_totals(chunk[chunk[CUSTOMER_KEY].notna()]))
+    if partials:
+        totals = pd.concat(partials).groupby(level=0).sum()
+    else:
+        totals = pd.DataFrame(columns=list(AMOUNT_COLUMNS) + ["accounts"], dtype=np.int64)
+    totals.index.name = CUSTOMER_KEY
+
+    limit_pence = int(limit * 100)
+    compensatable = totals["compensatable_amount"].to_numpy()
+    compensation = np.clip(compensatable, 0, limit_pence)
+    summary = pd.DataFrame({"accounts": totals["accounts"]}, index=totals.index)
+    for column in AMOUNT_COLUMNS:
+        summary[column] = totals[column] / 100
+    summary["compensation"] = compensation / 100
+    summary["excess"] = (compensatable - compensation).clip(min=0) / 100
+    summary["over_limit"] = totals["account_balance_in_sterling"] > limit_pence
+    return summary
+
+
+def over_limit_customers(summary):
+    """Customers of an aggregate_customers() summary whose sterling balances
+    add up to more than its limit
+    """
+    return summary.index[summary["over_limit"].to_numpy(dtype=bool)]
@@ -0,0 +1,92 @@
+# Cross-file duplicate detection for a whole submission.
+#
+# The engine's duplicate checks only ever see one file, but an account can
+# turn up in both the SCV and the EX file of a submission, or in two parts
+# of a split file. A DuplicateIndex is a SQLite table of normalised account
+# numbers, SCV record IDs and address + postcode keys that every file of a
+# run adds to, from any number of worker processes, one chunk at a time.
+# Once all files are in, keys found in more than one file are the
+# cross-file duplicates.
+import os
+import sqlite3
+
+import pandas as pd
+
+INDEX_FILE = "duplicate-index.sqlite"
+REPORT_FILE = "cross-file-duplicates.csv"
+
+# Seconds a worker waits for another one to finish writing
+BUSY_TIMEOUT = 300
+
+
+def normalise(values):
+    """Upper-case text with surrounding whitespace removed and runs collapsed"""
+    return values.astype(str).str.strip().str.upper().str.replace(r"\s+", " ", regex=True)
+
+
+def duplicate_keys(chunk):
+    """The normalised cross-file keys of a chunk, by kind, for populated rows"""
+    keys = {}
+    for kind in ("account_number", "single_customer_view_record"):
+        if kind in chunk.columns:
+            keys[kind] = normalise(chunk[kind].dropna())
+    if "address_line_1" in chunk.columns:
+        lines = chunk["address_line_1"].dropna()
+        postcodes = chunk["postcode"] if "postcode" in chunk.columns \
+            else pd.Series("", index=chunk.index)
+        keys["address"] = (normalise(lines) + "_"
+                           + normalise(postcodes.reindex(lines.index).fillna("")))
+    return keys
+
+
+class DuplicateIndex:
+    """Keys of every file in a run, in a SQLite database at *path*"""
+
+    def __init__(self, path, timeout=BUSY_TIMEOUT):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        with self._connection:
+            # WAL lets workers add keys while others read
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS keys ("
+                                     "kind TEXT NOT NULL, key TEXT NOT NULL, "
+                                     "file TEXT NOT NULL, row INTEGER NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS keys_by_key ON keys (kind, key)")
+
+    @classmethod
+    def create(cls, path):
+        """A new, empty index at *path*, replacing any left by an earlier run"""
+        for stale in (path, f"{path}-wal", f"{path}-shm"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        return cls(path)
+
+    def add(self, file_path, chunk):
+        """Add the keys of one chunk of *file_path*; row labels are file rows"""
+        file_path = str(file_path)
+        with self._connection:
+            for kind, keys in duplicate_keys(chunk).items():
+                self._connection.executemany(
+                    "INSERT INTO keys (kind, key, file, row) VALUES (?, ?, ?, ?)",
+                    ((kind, key, file_path, int(row)) for row, key in keys.items()))
+
+    def duplicates(self):
+        """Every occurrence of a key found in more than one file
+
+        One row per occurrence: kind, key, file and row (0-based data row).
+        """
+        return pd.read_sql_query(
+            "SELECT kind, key, file, row FROM keys WHERE (kind, key) IN ("
+            "  SELECT kind, key FROM keys GROUP BY kind, key"
+            "  HAVING COUNT(DISTINCT file) > 1"
+            ") ORDER BY kind, key, file, row", self._connection)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,120 @@
+# Registry of validation error messages and their stable integer codes.
+#
+# A message's code is its position in ERROR_MESSAGES, so codes never change
+# as long as new messages are only ever appended to the end. Validation
+# records codes; the English text is only looked up when output is written.
+# Types declared in the rules sheet register their messages after these.
+#
+# A cell's failures are a bitmask over these codes: bit code % 64 of the
+# code // 64-th uint64 word. The bit of a code is the same in every column,
+# chunk and run, so masks combine with plain bitwise operations.
+import numpy as np
+
+from .hierarchy import PRODUCT_HIERARCHY, violation_message
+
+WORD_BITS = 64
+
+DATA_TYPES = ('AlphaNumeric', 'Alpha', 'Numeric', 'Decimal', 'Email',
+              'Phone', 'IBAN', 'BIC', 'ASCII')
+
+ERROR_MESSAGES = list((
+    "Missing Mandatory Value",
+    "Exceeds Max Length",
+    "Duplicate Account Number",
+    "Duplicate SCV Record",
+    "Duplicate Address",
+    "Invalid Product Type",
+    "Invalid product type",
+    "Invalid Exclusion Type",
+    "Exclusion Type is mandatory for exclusion files",
+    "Invalid Format - Must be Numeric or Alphanumeric",
+    "Invalid Phone Number Format",
+    "Invalid Sort Code Format",
+    "Invalid Date Format (Should be DDMMYYYY)",
+    "Invalid Identifier Type",
+    "Mandatory for Individual",
+    "Mandatory if other_national_identity_number is provided",
+    "Mandatory when third forename is present",
+    "Mandatory if address_line_4 or address_line_5 is populated",
+    "Mandatory if address_line_5 or address_line_6 is populated",
+    "Mandatory if address_line_6 is populated",
+    "Mandatory unless exclusion_type is BEN",
+    "Mandatory for non-exclusive files",
+    "Invalid value. Must be YES or NO",
+    "Potential THB - Balance exceeds compensation limit",
+    "Trust Sub-fund without election reference",
+    "Junior ISA/Child Trust Fund should be in Exclusions View",
+    "PO Box address found - Verify delivery capability",
+    "Missing prisoner number in prison address",
+    "Invalid branch jurisdiction - Must be GBR or GIB",
+    "Product hierarchy violation for continuity of access",
+    "Currency conversion mismatch",
+    "Address Line Continuity Error",
+    "Invalid BFPO Format",
+    "Care of Address - NFFSTP",
+    "Invalid BRRD Flag",
+    "Invalid Structured Deposit Flag",
+    "First Name Contains Only Initials",
+    "Repeated Forename",
+    "Surname Too Short",
+    "Invalid Country Code",
+    "Invalid Characters Outside ASCII Range",
+) + tuple(f"Invalid {data_type} Format" for data_type in DATA_TYPES) \
+  + tuple(f"Mandatory when address line {line_num} or higher is populated"
+          for line_num in range(2, 8)) \
+  + tuple(violation_message(product) for product in PRODUCT_HIERARCHY) + (
+    "Potential THB - Customer balances exceed compensation limit",
+))
+
+ERROR_CODES = {message: code for code, message in enumerate(ERROR_MESSAGES)}
+BUILTIN_MESSAGES = len(ERROR_MESSAGES)
+
+
+def error_code(message):
+    """Stable code of a registered message; KeyError for unknown messages"""
+    return ERROR_CODES[message]
+
+
+def error_message(code):
+    return ERROR_MESSAGES[code]
+
+
+def register_error_message(message):
+    """Code for a message declared at run time, registering it if it is new
+
+    These codes follow the built-in ones in registration order, so they are
+    only stable for a given rules sheet.
+    """
+    if message not in ERROR_CODES:
+        ERROR_CODES[message] = len(ERROR_MESSAGES)
+        ERROR_MESSAGES.append(message)
+    return ERROR_CODES[message]
+
+
+def registered_messages():
+    """Messages registered at run time, in the order that gave them their codes"""
+    return ERROR_MESSAGES[BUILTIN_MESSAGES:]
+
+
+def mask_words():
+    """uint64 words a mask needs to hold every registered code"""
+    return -(-len(ERROR_MESSAGES) // WORD_BITS)
+
+
+def code_bit(code):
+    """The word of a mask that holds *code*, and its bit in that word"""
+    return code // WORD_BITS, np.uint64(1) << np.uint64(code % WORD_BITS)
+
+
+def word_codes(word, value):
+    """Codes whose bits are set in *value*, the word-th word of a mask"""
+    value = int(value)
+    return [word * WORD_BITS + bit for bit in range(WORD_BITS) if value >> bit & 1]
+
+
+def popcount(masks):
+    """Number of bits set in each uint64 of *masks*"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks)
+    bits = np.unpackbits(np.ascontiguousarray(masks).view(np.uint8))
+    return bits.reshape(*masks.shape, WORD_BITS).sum(axis=-1)
@@ -0,0 +1,51 @@
+# Product hierarchy check for continuity of access.
+#
+# Products rank from instant access (IAA) down to Other. A row holding a
+# transferable eligible deposit violates the hierarchy when a product of
+# higher priority appears earlier in the file. Only the highest-priority
+# product seen so far can decide that, so the check keeps just that one
+# product rather than every product seen, and each chunk takes a cumulative
+# minimum over its priority column.
+import numpy as np
+
+PRODUCT_HIERARCHY = {
+    "IAA": 1,  # Instant Access highest priority
+    "ISA": 2,
+    "NA": 3,
+    "FD1": 4,
+    "FD2": 5,
+    "FD4": 6,
+    "Other": 7
+}
+PRODUCTS_BY_PRIORITY = {priority: product for product, priority in PRODUCT_HIERARCHY.items()}
+
+# No product seen yet; outranks nothing
+UNRANKED = len(PRODUCT_HIERARCHY) + 1
+
+
+def violation_message(outranked_by):
+    """Error message for a product outranked by the product *outranked_by*"""
+    return f"Product hierarchy violation for continuity of access - {outranked_by} appears earlier"
+
+
+class ProductHierarchy:
+    """The highest-priority product seen so far in a file"""
+
+    def __init__(self):
+        self.highest = UNRANKED
+
+    def outranked(self, priorities):
+        """Record a column of product priorities, in file order
+
+        Returns, per row, the priority of the product that outranks it, or 0
+        when nothing seen before the row does.
+        """
+        priorities = np.asarray(priorities, dtype=np.int64)
+        if not len(priorities):
+            return np.zeros(0, dtype=np.int64)
+        before = np.empty_like(priorities)
+        before[0] = self.highest
+        np.minimum.accumulate(priorities[:-1], out=before[1:])
+        np.minimum(before, self.highest, out=before)
+        self.highest = min(self.highest, int(priorities.min()))
+        return np.where(before < priorities, before, 0)
@@ -0,0 +1,136 @@
+# Incremental revalidation of resubmitted files.
+#
+# Each validated row is cached in a Parquet sidecar next to its result file,
+# keyed by a hash of the row's content together with everything else its
+# results depend on: the profile's checks, the rules and the engine version.
+# The cache holds the row's error masks with every cross-row check passed,
+# plus the keys those checks use. On resubmission only rows whose hash is
+# new are validated again; the duplicate and product-hierarchy checks are
+# then re-resolved for the whole file from the cached and fresh keys,
+# exactly as sharding.merge_cross_row() does for parallel shards.
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .columnar import CHECKS, ENGINE_VERSION, TYPE_CHECKS, ErrorMasks
+from .error_codes import error_code
+from .patterns import VALIDATORS
+from .sharding import CROSS_ROW_COLUMNS, merge_cross_row, validate_row_local
+
+# Bump when the layout of the cache changes; see columnar.ENGINE_VERSION for
+# changes to the results themselves
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".cache.parquet"
+HASH_COLUMN = "__row_hash"
+KEY_PREFIX = "__key_"
+
+
+def cache_path(output_path):
+    """Sidecar cache for a result file: x-result.xlsx -> x-result.cache.parquet"""
+    return Path(output_path).with_suffix(CACHE_SUFFIX)
+
+
+def _describe(function):
+    # Closures such as the AlphaNumeric checks differ only in what they capture
+    captured = [cell.cell_contents for cell in function.__closure__ or ()]
+    return f"{function.__module__}.{function.__qualname__}{captured!r}"
+
+
+def fingerprint(frame, rules, profile, is_exclusion_file=False):
+    """Everything besides a row's own content that its results depend on
+
+    That is the engine version, the profile's column and type checks, the
+    validators those look up, the rules, and the error codes of the types
+    the rules declare, which are numbered in the order rule sets are
+    compiled.
+    """
+    checks = _describe(CHECKS[profile])
+    type_checks = sorted((data_type, _describe(check))
+                         for data_type, check in TYPE_CHECKS[profile].items())
+    declared = sorted((rule.data_type, error_code(f"Invalid {rule.data_type} Format"))
+                      for rule in rules if rule.declared is not None)
+    validators = sorted((name, validator.pattern, validator.full, validator.strip,
+                         validator.upper, validator.remove_spaces)
+                        for name, validator in VALIDATORS.items())
+    text = repr((CACHE_VERSION, ENGINE_VERSION, profile, checks, type_checks, validators,
+                 is_exclusion_file, list(frame.columns), sorted(repr(rule) for rule in rules),
+                 declared))
+    return np.uint64(int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little"))
+
+
+def row_hashes(frame, salt):
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy() ^ salt
+
+
+def load_cache(cache_file, columns):
+    """Cached rows indexed by hash; empty when missing or not for *columns*
+
+    *columns* are the validated columns, each of which must have its masks
+    in the cache.
+    """
+    if cache_file is None or not Path(cache_file).exists():
+        return None
+    cached = pd.read_parquet(cache_file)
+    if HASH_COLUMN not in cached.columns \
+            or not {f"{name}:0" for name in columns} <= set(cached.columns):
+        return None
+    return cached.set_index(HASH_COLUMN)
+
+
+def save_cache(cache_file, hashes, results, recorded):
+    stored = results.to_frame()
+    for kind, keys in recorded.items():
+        stored[KEY_PREFIX + kind] = keys
+    stored[HASH_COLUMN] = hashes
+    stored = stored.drop_duplicates(HASH_COLUMN)
+    # Write then rename, so an interrupted run never leaves a torn cache
+    partial = Path(f"{cache_file}.partial")
+    stored.to_parquet(partial, index=False)
+    os.replace(partial, cache_file)
+
+
+def _stored_keys(kind, keys):
+    # Keys go through Parquet, so store them the way they will be read back
+    if kind == "products":
+        return keys.astype("int64")
+    return keys.astype(str).astype(object)
+
+
+def validate_incremental(frame, rules, profile, cache_file, is_exclusion_file=False):
+    """validate_columns() that reuses the cached results of unchanged rows
+
+    Rows are matched by content, so reordered, inserted and deleted rows are
+    all handled. The output is identical to a full run, and *cache_file* is
+    rewritten to describe this submission.
+    """
+    hashes = row_hashes(frame, fingerprint(frame, rules, profile, is_exclusion_file))
+    validated = [name for name in frame.columns if name in rules]
+    cached = load_cache(cache_file, validated)
+    known = np.zeros(len(frame), dtype=bool) if cached is None \
+        else np.isin(hashes, cached.index.to_numpy())
+
+    fresh, fresh_keys = validate_row_local(frame[~known], rules, profile, is_exclusion_file)
+    reused = cached.loc[hashes[known]] if cached is not None else pd.DataFrame()
+    reused.index = frame.index[known]
+    results = fresh
+    if known.any():
+        # The checks that run do not depend on the rows, so the fresh rows'
+        # order holds for the cached ones too
+        reused_results = ErrorMasks.from_frame(reused, fresh.columns, fresh.order)
+        results = ErrorMasks.concat([reused_results, fresh]).reindex(frame.index)
+
+    recorded = {}
+    for kind in CROSS_ROW_COLUMNS:
+        parts = []
+        if KEY_PREFIX + kind in reused.columns:
+            parts.append(_stored_keys(kind, reused[KEY_PREFIX + kind].dropna()))
+        if kind in fresh_keys:
+            parts.append(_stored_keys(kind, fresh_keys[kind]))
+        if parts:
+            recorded[kind] = pd.concat(parts).sort_index()
+
+    save_cache(cache_file, hashes, results, recorded)
+    return merge_cross_row(frame, results, [recorded], rules, profile, is_exclusion_file)
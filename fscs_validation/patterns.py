@@ -0,0 +1,131 @@
+# Regular expressions behind the field validators, each compiled once.
+#
+# VALIDATORS maps every "Type of data" (and a few field formats such as
+# BFPO) to a Validator holding its precompiled pattern, with a scalar
+# check(value) and a vectorized check_series(values). The checks in
+# columnar.py look their validators up here by name, so a validator
+# registered again replaces the check wherever it is used. Nothing here
+# leans on the re module's small internal cache, which thrashes once more
+# than a dozen or so patterns are in play.
+#
+# Checks of a single value run once per distinct value of a column (see
+# per_value), since most SCV columns (product_type, currency, country,
+# title, the Yes/No flags) hold only a handful of them.
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ALPHANUMERIC_PATTERN = r"[A-Za-z0-9 '-]+"
+# Modified to accept parentheses, periods, and additional characters
+EXTENDED_ALPHANUMERIC_PATTERN = r"[A-Za-z0-9 '\-\(\)\.,]+"
+ALPHA_PATTERN = r"[A-Za-z '-]+"
+NUMERIC_PATTERN = r'^[0-9]+$'
+DECIMAL_PATTERN = r'\d+\.\d+'
+DATE_PATTERN = r'\d{2}\d{2}\d{4}'
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_PATTERN = r'^(\+|00)?[0-9]{1,15}$'
+IBAN_PATTERN = r'^[A-Z]{2}[0-9]{2}[A-Z0-9]{11,30}$'
+BIC_PATTERN = r'^[A-Z]{6}[A-Z2-9][A-NP-Z0-9]([A-Z0-9]{3})?$'
+BFPO_PATTERN = r'^BFPO\s+\d+$'
+ASCII_PATTERN = r'[\x20-\x7f]*'
+
+
+@lru_cache(maxsize=None)
+def compiled(pattern):
+    return re.compile(pattern)
+
+
+def per_value(func, values, dtype=None):
+    """func(value) for each of *values*, calling func once per distinct value
+
+    Only for checks that depend on nothing but the value itself; duplicate
+    and other cross-row checks must see every row.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return np.array([func(value) for value in uniques], dtype=dtype)[codes]
+
+
+def match_all(texts, pattern, full=False):
+    """Whether each string in *texts* matches *pattern* (re.match or re.fullmatch)"""
+    regex = compiled(pattern)
+    test = regex.fullmatch if full else regex.match
+    return per_value(lambda text: test(text) is not None, texts, dtype=bool)
+
+
+class Validator:
+    """A "Type of data" checked against one precompiled pattern
+
+    Values are turned into text and cleaned the way the original scalar
+    validators did (strip, upper-case, drop spaces) before matching.
+    Missing values always pass.
+    """
+
+    def __init__(self, name, pattern, full=True, strip=False, upper=False, remove_spaces=False):
+        self.name = name
+        self.pattern = pattern
+        self.full = full
+        self.strip = strip
+        self.upper = upper
+        self.remove_spaces = remove_spaces
+        regex = compiled(pattern)
+        self._test = regex.fullmatch if full else regex.match
+
+    def clean(self, text):
+        if self.strip:
+            text = text.strip()
+        if self.upper:
+            text = text.upper()
+        if self.remove_spaces:
+            text = text.replace(' ', '')
+        return text
+
+    def check(self, value):
+        if pd.isna(value):
+            return True
+        return self._test(self.clean(str(value))) is not None
+
+    __call__ = check
+
+    def check_series(self, values):
+        """Vectorized check(): one bool per value of the Series"""
+        present = values.notna().to_numpy()
+        ok = np.ones(len(values), dtype=bool)
+        test, clean = self._test, self.clean
+        ok[present] = per_value(lambda value: test(clean(str(value))) is not None,
+                                values[present], dtype=bool)
+        return ok
+
+    def __repr__(self):
+        return f"Validator({self.name!r}, {self.pattern!r})"
+
+
+VALIDATORS = {}
+
+
+def register_validator(name, pattern, **options):
+    """Register (or replace) the validator for a "Type of data" name"""
+    validator = Validator(name, pattern, **options)
+    VALIDATORS[name] = validator
+    return validator
+
+
+def get_validator(name):
+    return VALIDATORS.get(name)
+
+
+register_validator('AlphaNumeric', EXTENDED_ALPHANUMERIC_PATTERN)
+register_validator('StrictAlphaNumeric', ALPHANUMERIC_PATTERN)
+register_validator('Alpha', ALPHA_PATTERN)
+# Inputs are read as text, so only spaces need removing
+register_validator('Numeric', NUMERIC_PATTERN, full=False, strip=True, remove_spaces=True)
+register_validator('Decimal', DECIMAL_PATTERN)
+register_validator('Date', DATE_PATTERN)
+register_validator('Email', EMAIL_PATTERN, full=False)
+# Allow +, 00 prefix and only digits
+register_validator('Phone', PHONE_PATTERN, full=False, strip=True)
+register_validator('IBAN', IBAN_PATTERN, full=False, upper=True, remove_spaces=True)
+register_validator('BIC', BIC_PATTERN, full=False, upper=True)
+register_validator('BFPO', BFPO_PATTERN, full=False, upper=True)
+register_validator('ASCII', ASCII_PATTERN)
@@ -0,0 +1,350 @@
+# One validate_file for every workflow.
+#
+# Each entry point takes a profile (see profiles.py) that decides which
+# rules apply; reading, validation, output and the batch runner are shared.
+import os
+from contextlib import nullcontext
+from functools import partial
+
+from .columnar import collect_failures, iter_failures, validate_chunks
+from .customers import (
+    COMPENSATION_LIMIT, aggregate_customers, customers_path, over_limit_customers,
+)
+from .duplicate_index import INDEX_FILE, REPORT_FILE, DuplicateIndex
+from .incremental import cache_path, validate_incremental
+from .profiles import get_profile
+from .quickcheck import ERROR_BUDGET, SAMPLE_ROWS, STRATA, print_quick_check, quick_check
+from .readers import DEFAULT_CHUNKSIZE, INPUT_SUFFIXES, iter_chunks, read_input, sample_rows
+from .reconciliation import RATE_TOLERANCE, TOLERANCE, mismatch_summary, reconcile
+from .rules import RULES_FILE, RuleSet
+from .runner import print_summary, run_batch
+from .sharding import validate_sharded
+from .structure import check_structure
+from .timing import Timings, phase, print_timings, timed, timings_path
+from .writers import format_output, open_sink, open_writer
+
+RESULT_SUFFIX = '-result.xlsx'
+# In the name of every result file and of the files saved beside it
+RESULT_MARK = '-result.'
+
+
+# Rule sets compiled in this process, by workbook and its mtime
+_loaded_rules = {}
+
+
+def load_rules(path=RULES_FILE):
+    """Compile the "Data inputs" sheet on first use
+
+    Each workbook is compiled once per process; RuleSet.load keeps a cache
+    on disk as well, so even that seldom parses the workbook. The rules are
+    the same for every profile: which checks apply is the profile's concern.
+    """
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if key not in _loaded_rules:
+        _loaded_rules[key] = RuleSet.load(path)
+    return _loaded_rules[key]
+
+
+def _rules(rules):
+    if rules is None:
+        return load_rules(RULES_FILE)
+    return RuleSet.coerce(rules)
+
+
+def check_footer(file_path, rules=None):
+    """Check a file's header, footer and record count before validating it
+
+    Reads only the ends of the file. Prints a warning when the FSCS footer
+    is missing, and raises structure.FileStructureError when the file is
+    malformed: empty, without a header row, or with a footer record count
+    that does not match its records.
+    """
+    report = check_structure(file_path, rules)
+    for message in report.warnings:
+        print(f"Warning: {message}")
+    report.raise_for_problems()
+    return report
+
+
+def _chunks(file_path, rules, profile, chunksize):
+    chunks = iter_chunks(file_path, rules, chunksize, profile.footer)
+    if profile.exclusion_files:
+        flag = 'Yes' if profile.is_exclusion_file(file_path) else ''
+        chunks = (chunk.assign(Exclusion_File=flag) for chunk in chunks)
+    return chunks
+
+
+def _customers_over_limit(file_path, rules, profile, chunksize, summary=None):
+    """The customers over the compensation limit, for profiles that apply it
+
+    Chunked validation needs them before its first chunk, so this reads the
+    file once more, unless the *summary* of its customers is at hand.
+    """
+    if not profile.customer_limit:
+        return None
+    if summary is None:
+        with phase("customers"):
+            summary = aggregate_customers(_chunks(file_path, rules, profile, chunksize))
+    return over_limit_customers(summary)
+
+
+def _recording_timings(output_path, run):
+    """run() with a Timings recording, saved beside output_path afterwards"""
+    timings = Timings()
+    with timings.activate():
+        result = run()
+    timings.save(timings_path(output_path))
+    return result
+
+
+def validate_file(file_path, rules=None, profile="batch", workers=None, cache_file=None,
+                  timings=None):
+    """Validate one SCV/EX file; returns data rows interleaved with result rows
+
+    *rules* is a RuleSet or a raw rules frame, loaded from RULES_FILE when
+    omitted. *workers* spreads a large file over that many processes and
+    *cache_file* turns on incremental revalidation. Pass a timing.Timings as
+    *timings* to record phase, column and rule timings (rule timings are
+    only recorded for rows validated in this process).
+    """
+    if timings is not None:
+        with timings.activate():
+            return validate_file(file_path, rules, profile, workers, cache_file)
+    profile = get_profile(profile)
+    rules = _rules(rules)
+    is_exclusion_file = profile.is_exclusion_file(file_path)
+    if profile.footer:
+        check_footer(file_path, rules)
+    with phase("read"):
+        new_data_df = read_input(file_path, rules, profile.footer)
+    if profile.exclusion_files:
+        new_data_df['Exclusion_File'] = 'Yes' if is_exclusion_file else ''
+
+    with phase("validate"):
+        if cache_file is not None:
+            results = validate_incremental(new_data_df, rules, profile.name, cache_file,
+                                           is_exclusion_file)
+        else:
+            results = validate_sharded(new_data_df, rules, profile.name, workers,
+                                       is_exclusion_file)
+    with phase("build"):
+        formatted_df = format_output(new_data_df, results)
+    return formatted_df
+
+
+def _duplicate_index(path):
+    return DuplicateIndex(path) if path is not None else nullcontext()
+
+
+def validate_file_streaming(file_path, rules, output_path, profile="batch",
+                            chunksize=DEFAULT_CHUNKSIZE, layout="interleaved",
+                            duplicate_index=None, timings=False, customers=False):
+    """Validate a file chunk by chunk, writing results to output_path as it goes
+
+    *layout* is one of writers.LAYOUTS; the output format follows the
+    extension of output_path (.xlsx, .csv or .parquet). Each chunk's keys
+    are also added to the DuplicateIndex at *duplicate_index*, if given.
+    With *timings*, phase, column and rule timings are saved as JSON beside
+    output_path. With *customers*, the customer_summary() of the file is
+    saved beside it as CSV. Returns the number of records validated.
+    """
+    if timings:
+        return _recording_timings(output_path, lambda: validate_file_streaming(
+            file_path, rules, output_path, profile, chunksize, layout, duplicate_index,
+            customers=customers))
+    profile = get_profile(profile)
+    rules = _rules(rules)
+    is_exclusion_file = profile.is_exclusion_file(file_path)
+    if profile.footer:
+        check_footer(file_path, rules)
+    summary = None
+    if customers:
+        with phase("customers"):
+            summary = aggregate_customers(_chunks(file_path, rules, profile, chunksize))
+        summary.to_csv(customers_path(output_path))
+    over_limit = _customers_over_limit(file_path, rules, profile, chunksize, summary)
+    records = 0
+    with open_writer(output_path, layout) as writer, _duplicate_index(duplicate_index) as index:
+        chunks = timed("read", _chunks(file_path, rules, profile, chunksize))
+        for chunk, results in timed("validate", validate_chunks(chunks, rules, profile.name,
+                                                                is_exclusion_file, over_limit)):
+            writer.write(chunk, results)
+            if index is not None:
+                with phase("duplicate index"):
+                    index.add(file_path, chunk)
+            records += len(chunk)
+    return records
+
+
+def validate_file_errors(file_path, rules=None, profile="batch", chunksize=DEFAULT_CHUNKSIZE):
+    """Validate a file chunk by chunk, keeping only the cells that fail
+
+    Returns a columnar.FailureReport with the failing (row, column, error
+    codes) records and per-column and per-error counts.
+    """
+    profile = get_profile(profile)
+    rules = _rules(rules)
+    if profile.footer:
+        check_footer(file_path, rules)
+    return collect_failures(_chunks(file_path, rules, profile, chunksize), rules, profile.name,
+                            profile.is_exclusion_file(file_path),
+                            _customers_over_limit(file_path, rules, profile, chunksize))
+
+
+def iter_file_errors(file_path, rules=None, profile="batch", chunksize=DEFAULT_CHUNKSIZE):
+    """validate_file_errors() one chunk at a time, yielding (chunk, FailureReport)
+
+    Each report holds only its own chunk's failures, so they can be passed
+    on as soon as they are found.
+    """
+    profile = get_profile(profile)
+    rules = _rules(rules)
+    if profile.footer:
+        check_footer(file_path, rules)
+    return iter_failures(_chunks(file_path, rules, profile, chunksize), rules, profile.name,
+                         profile.is_exclusion_file(file_path),
+                         _customers_over_limit(file_path, rules, profile, chunksize))
+
+
+def validate_file_incremental(file_path, rules, output_path, profile="batch",
+                              duplicate_index=None, timings=False, customers=False):
+    """Revalidate a resubmitted file, re-running only rows changed since the
+    last run; the cache lives next to output_path. Returns the record count.
+    """
+    if timings:
+        return _recording_timings(output_path, lambda: validate_file_incremental(
+            file_path, rules, output_path, profile, duplicate_index, customers=customers))
+    profile = get_profile(profile)
+    formatted_df = validate_file(file_path, rules, profile, cache_file=cache_path(output_path))
+    with phase("write"), open_sink(output_path) as sink:
+        sink.write(formatted_df)
+    if customers:
+        with phase("customers"):
+            customer_summary(file_path, rules, profile).to_csv(customers_path(output_path))
+    if duplicate_index is not None:
+        with phase("duplicate index"), DuplicateIndex(duplicate_index) as index:
+            for chunk in iter_chunks(file_path, _rules(rules), footer=profile.footer):
+                index.add(file_path, chunk)
+    return len(formatted_df) // 2
+
+
+def quick_check_file(file_path, rules=None, profile="batch", rows=SAMPLE_ROWS, strata=STRATA,
+                     error_budget=ERROR_BUDGET, seed=0):
+    """Triage a file from its header and a stratified random sample of its rows
+
+    Stops sampling once the share of failing rows is confidently above
+    *error_budget*. Returns a quickcheck.QuickCheckReport with the header
+    and footer problems and per-column error rate estimates; see
+    quickcheck.py. The footer is checked, and never sampled as a record,
+    whatever the profile.
+    """
+    profile = get_profile(profile)
+    rules = _rules(rules)
+    samples = sample_rows(file_path, rules, rows, strata, seed, footer=True)
+    if profile.exclusion_files:
+        flag = 'Yes' if profile.is_exclusion_file(file_path) else ''
+        samples = ((frame.assign(Exclusion_File=flag), size) for frame, size in samples)
+    return quick_check(check_structure(file_path, rules), samples, rules, profile.name,
+                       profile.is_exclusion_file(file_path), error_budget, strata)
+
+
+def customer_summary(file_path, rules=None, profile="batch2", chunksize=DEFAULT_CHUNKSIZE,
+                     limit=COMPENSATION_LIMIT):
+    """Per-customer totals of a file and the compensation limit applied to them
+
+    See customers.aggregate_customers(); the file is read chunk by chunk.
+    """
+    profile = get_profile(profile)
+    return aggregate_customers(_chunks(file_path, _rules(rules), profile, chunksize),
+                               limit)
+
+
+def reconcile_file(file_path, rules=None, profile="batch2", tolerance=TOLERANCE, fx_rates=None,
+                   rate_tolerance=RATE_TOLERANCE):
+    """Reconcile the sterling balances of a file's foreign-currency accounts
+
+    *fx_rates* is a {currency: rate} dict or the path of a currency,rate CSV
+    to cross-check the declared exchange rates against. Returns the
+    reconciled rows and their mismatch summary; see reconciliation.py.
+    """
+    profile = get_profile(profile)
+    reconciled = reconcile(read_input(file_path, _rules(rules), profile.footer), tolerance,
+                           fx_rates, rate_tolerance)
+    return reconciled, mismatch_summary(reconciled)
+
+
+def report_cross_file_duplicates(index_path, report_path):
+    """Write the cross-file duplicates in the index to a CSV; returns their count"""
+    with DuplicateIndex(index_path) as index:
+        duplicates = index.duplicates()
+    duplicates.to_csv(report_path, index=False)
+    keys = duplicates[["kind", "key"]].drop_duplicates()
+    print(f"{len(keys)} keys duplicated across files; see {report_path}")
+    return len(keys)
+
+
+def is_output_file(name):
+    """Whether *name* is a file that runs write: a result file, anything saved
+    beside it (x-result.customers.csv and so on) or the cross-file report
+    """
+    return RESULT_MARK in name or name == REPORT_FILE
+
+
+def _input_files(input_dir):
+    # Get all SCV/EX files (Excel or delimited) in the directory
+    return [f for f in os.listdir(input_dir)
+            if f.lower().endswith(INPUT_SUFFIXES) and not is_output_file(f)]
+
+
+def quick_check_directory(input_dir, profile="batch", rules_path=RULES_FILE, rows=SAMPLE_ROWS,
+                          error_budget=ERROR_BUDGET):
+    """Quick-check every SCV/EX file in input_dir; prints and returns the reports"""
+    profile = get_profile(profile)
+    rules = load_rules(rules_path)
+    reports = []
+    for file_name in sorted(_input_files(input_dir)):
+        report = quick_check_file(os.path.join(input_dir, file_name), rules, profile, rows,
+                                  error_budget=error_budget)
+        print_quick_check(report)
+        reports.append(report)
+    return reports
+
+
+def run_directory(input_dir, output_dir=None, profile="batch", rules_path=RULES_FILE,
+                  incremental=False, workers=None, cross_file=False, timings=False,
+                  customers=False):
+    """Validate every SCV/EX file in input_dir in parallel
+
+    Each file's results go to <name>-result.xlsx in output_dir (input_dir by
+    default). With *cross_file*, account numbers, SCV records and addresses
+    duplicated between files are also reported, in cross-file-duplicates.csv.
+    With *timings*, each file's timings are saved beside its results and the
+    slowest phases and rules of the run printed. With *customers*, each
+    file's per-customer totals are saved beside its results as well. Prints and returns one
+    status record per file.
+    """
+    profile = get_profile(profile)
+    output_dir = output_dir if output_dir is not None else input_dir
+    input_files = _input_files(input_dir)
+    print(f"Found {len(input_files)} files to process")
+
+    jobs = [(os.path.join(input_dir, file_name),
+             os.path.join(output_dir, file_name.rsplit('.', 1)[0] + RESULT_SUFFIX))
+            for file_name in input_files]
+    job = partial(validate_file_incremental if incremental else validate_file_streaming,
+                  profile=profile.name)
+    if cross_file:
+        index_path = os.path.join(output_dir, INDEX_FILE)
+        DuplicateIndex.create(index_path).close()
+        job = partial(job, duplicate_index=index_path)
+    if timings:
+        job = partial(job, timings=True)
+    if customers:
+        job = partial(job, customers=True)
+    summary = run_batch(jobs, job, rules_path, workers)
+    print_summary(summary)
+    if timings:
+        print_timings([timings_path(output_path) for _, output_path in jobs])
+    if cross_file:
+        report_cross_file_duplicates(index_path, os.path.join(output_dir, REPORT_FILE))
+    return summary
@@ -0,0 +1,72 @@
+# Validation profiles: the rule sets the different FSCS workflows apply.
+#
+# A profile names the column checks the columnar engine runs, the checks
+# it applies to each "Type of data", and how a file is prepared for it. The five
+# built-in profiles are the rule sets of the original scripts, drift and
+# all, so every workflow keeps producing the results it always has:
+#
+#   script    notebook check of single files, strict AlphaNumeric rule
+#   script2   as script, plus the numeric-field checks
+#   batch     base batch rules, unique SCV records (alias "base")
+#   batch2    batch plus the extended FSCS guide checks (alias "extended")
+#   batch3    exclusion-file (EX) checks (alias "exclusion")
+#
+# New rule sets plug in through register_profile().
+from pathlib import Path
+
+from .columnar import CHECKS, TYPE_CHECKS
+
+
+class Profile:
+    """A named rule set and the file handling that goes with it"""
+
+    def __init__(self, name, type_checks=None, exclusion_files=False, footer=False,
+                 checks=None, customer_limit=False):
+        self.name = name
+        # {"Type of data": vectorized check}; see columnar.TYPE_CHECKS
+        self.type_checks = type_checks if type_checks is not None else TYPE_CHECKS[name]
+        # Files with "EX" in their name are exclusion files, and the output
+        # gets an Exclusion_File column
+        self.exclusion_files = exclusion_files
+        # Warn when a file does not end with the FSCS footer
+        self.footer = footer
+        # Apply the compensation limit per customer, which needs every
+        # customer's totals before a file is validated chunk by chunk
+        self.customer_limit = customer_limit
+        self.checks = checks if checks is not None else CHECKS[name]
+
+    def is_exclusion_file(self, file_path):
+        return self.exclusion_files and 'EX' in Path(file_path).name
+
+    def __repr__(self):
+        return f"Profile({self.name!r})"
+
+
+PROFILES = {}
+PROFILE_ALIASES = {"base": "batch", "extended": "batch2", "exclusion": "batch3"}
+
+
+def register_profile(profile):
+    """Make *profile* available by name to validate_file and the engine"""
+    PROFILES[profile.name] = profile
+    CHECKS[profile.name] = profile.checks
+    TYPE_CHECKS[profile.name] = profile.type_checks
+    return profile
+
+
+def get_profile(profile):
+    """Look a profile up by name or alias; Profile objects pass through"""
+    if isinstance(profile, Profile):
+        return profile
+    name = PROFILE_ALIASES.get(profile, profile)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown validation profile {profile!r}; "
+                         f"expected one of {sorted(PROFILES) + sorted(PROFILE_ALIASES)}")
+    return PROFILES[name]
+
+
+register_profile(Profile("script"))
+register_profile(Profile("script2"))
+register_profile(Profile("batch"))
+register_profile(Profile("batch2", footer=True, customer_limit=True))
+register_profile(Profile("batch3", exclusion_files=True))
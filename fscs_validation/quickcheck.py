@@ -0,0 +1,146 @@
+# Quick check: triage a file in seconds from its header and a sample of rows.
+#
+# The header is compared with the rules sheet, and the footer checked (see
+# structure.py) whatever the profile: a missing mandatory column or a
+# malformed file fails the check straight away. Otherwise a stratified random sample of rows
+# (see readers.sample_rows) is validated stratum by stratum with every
+# row-local rule. Cross-row checks (duplicates, the product hierarchy, the
+# per-customer compensation limit) are skipped, since sampled rows are not
+# neighbours. The unit of every estimate is the sampled row, since rows are
+# what is drawn: a column's error rate is the share of rows failing in that
+# column, and the file's the share of rows failing in any column. Cells of
+# one row are not independent draws, so they are never counted as such. Each
+# rate gets a Wilson score interval, and sampling stops early once the share
+# of failing rows is, with that confidence, above the error budget: a file
+# that broken needs fixing, not a full validation.
+import numpy as np
+import pandas as pd
+
+from .columnar import validate_failures
+from .sharding import DeferredState
+from .structure import check_header
+
+SAMPLE_ROWS = 10_000
+STRATA = 20
+# Largest share of sampled rows with a failing cell before a file is judged broken
+ERROR_BUDGET = 0.05
+# Sampled rows needed before the budget can stop a check
+MIN_SAMPLE = 500
+# Normal quantile of the confidence bounds (95%)
+Z = 1.96
+
+
+def wilson_interval(failures, trials, z=Z):
+    """Lower and upper confidence bounds of failures / trials"""
+    failures = np.asarray(failures, dtype=float)
+    trials = np.maximum(np.asarray(trials, dtype=float), 1)
+    rate = failures / trials
+    centre = rate + z * z / (2 * trials)
+    spread = z * np.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    scale = 1 + z * z / trials
+    return (centre - spread) / scale, (centre + spread) / scale
+
+
+class QuickCheckReport:
+    """Header conformance and estimated error rates of one file"""
+
+    def __init__(self, file_path, structure, rules, error_budget=ERROR_BUDGET, strata=STRATA):
+        self.file_path = file_path
+        self.structure = structure
+        columns = structure.header
+        self.missing, self.missing_mandatory, self.unexpected = check_header(columns, rules)
+        self.error_budget = error_budget
+        self.columns = [rule.name for rule in rules if rule.name in set(columns)]
+        self.strata = strata
+        self.sampled_strata = 0
+        self.sampled_rows = 0
+        self.stratum_rows = 0
+        # Sampled rows with at least one failing cell
+        self.failing_rows = 0
+        self.failures = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.stopped_early = False
+
+    def add(self, frame, stratum_rows, report):
+        """Count one validated stratum of the sample"""
+        self.sampled_strata += 1
+        self.sampled_rows += len(frame)
+        self.stratum_rows += stratum_rows
+        self.failing_rows += len(set(report.rows))
+        counts = report.column_counts()
+        self.failures = self.failures.add(counts.reindex(self.columns, fill_value=0)) \
+            .astype(np.int64)
+
+    @property
+    def estimated_rows(self):
+        """Rows in the file, from the strata sampled so far"""
+        if not self.sampled_strata:
+            return 0
+        return round(self.stratum_rows / self.sampled_strata * max(self.strata, 1))
+
+    def row_error_rate(self):
+        """Share of sampled rows with a failing cell, with its confidence bounds"""
+        lower, upper = wilson_interval(self.failing_rows, self.sampled_rows)
+        return self.failing_rows / max(self.sampled_rows, 1), float(lower), float(upper)
+
+    def over_budget(self):
+        """True once the failing share is confidently above the error budget"""
+        return self.sampled_rows >= MIN_SAMPLE and self.row_error_rate()[1] > self.error_budget
+
+    @property
+    def ok(self):
+        return self.structure.ok and not self.missing_mandatory and not self.over_budget()
+
+    def column_rates(self):
+        """Per column: sampled rows failing in it, the estimated error rate and its bounds"""
+        lower, upper = wilson_interval(self.failures.to_numpy(), self.sampled_rows)
+        rates = pd.DataFrame({
+            "column": self.columns,
+            "failures": self.failures.to_numpy(),
+            "rate": self.failures.to_numpy() / max(self.sampled_rows, 1),
+            "lower": lower,
+            "upper": upper,
+        })
+        return rates.sort_values(["rate", "column"], ascending=[False, True], ignore_index=True)
+
+
+def quick_check(structure, samples, rules, profile, is_exclusion_file=False,
+                error_budget=ERROR_BUDGET, strata=STRATA):
+    """Validate (frame, stratum rows) samples of a file until the budget is blown
+
+    *structure* is the file's structure.StructureReport; no rows are
+    sampled when it or the header is already enough to fail the file.
+    """
+    report = QuickCheckReport(structure.file_path, structure, rules, error_budget, strata)
+    if not structure.ok or report.missing_mandatory:
+        return report
+    for frame, stratum_rows in samples:
+        failures = validate_failures(frame, rules, profile, DeferredState(), is_exclusion_file)
+        report.add(frame, stratum_rows, failures)
+        if report.over_budget():
+            report.stopped_early = True
+            break
+    return report
+
+
+def print_quick_check(report, top=10):
+    """Print a report: header problems, the verdict, and the worst columns"""
+    print(f"{report.file_path}: {'OK' if report.ok else 'FAILED'}")
+    for message in report.structure.problems + report.structure.warnings:
+        print(f"  {message}")
+    if report.missing_mandatory:
+        print(f"  Missing mandatory columns: {', '.join(report.missing_mandatory)}")
+    optional = [name for name in report.missing if name not in report.missing_mandatory]
+    if optional:
+        print(f"  Missing optional columns: {', '.join(optional)}")
+    if report.unexpected:
+        print(f"  Columns not in the rules sheet: {', '.join(report.unexpected)}")
+    if not report.sampled_rows:
+        return
+    rate, lower, upper = report.row_error_rate()
+    print(f"  Sampled {report.sampled_rows} of about {report.estimated_rows} rows"
+          + (" (stopped early: over the error budget)" if report.stopped_early else ""))
+    print(f"  Failing rows: {rate:.2%} (95% CI {lower:.2%} - {upper:.2%}), "
+          f"budget {report.error_budget:.2%}")
+    rates = report.column_rates()
+    for record in rates[rates["failures"] > 0].head(top).itertuples():
+        print(f"  {record.column:<45} {record.rate:7.2%} ({record.lower:.2%} - {record.upper:.2%})")
@@ -0,0 +1,374 @@
+# Input readers for SCV/EX submissions.
+#
+# read_input() loads a whole file and iter_chunks() yields it as a sequence
+# of fixed-size DataFrames, so a file of any size can be validated without
+# ever holding all of it in memory. Both accept Excel workbooks and comma or
+# pipe delimited text, and read every rule column as text, stored compactly
+# (see store.py). Blank rows are skipped, and with footer=True so is the FSCS
+# footer row of twenty 9s that ends a file, which is not a record.
+# read_header() and sample_rows() read just enough of a file for a quick
+# check.
+import io
+import os
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .store import compact
+
+DEFAULT_CHUNKSIZE = 50_000
+FOOTER = '9' * 20
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm')
+DELIMITED_SUFFIXES = ('.csv', '.txt', '.psv', '.dat')
+INPUT_SUFFIXES = EXCEL_SUFFIXES + ('.xls',) + DELIMITED_SUFFIXES
+
+# Only empty cells are missing; "NA" is a product type, not a null
+NA_OPTIONS = {"keep_default_na": False, "na_values": [""]}
+QUOTE, NEWLINE, RETURN = ord('"'), ord('\n'), ord('\r')
+SCAN_BLOCK = 1 << 20
+
+
+def dtype_map(rules):
+    """Column name -> dtype (always str) for every column in the rule set"""
+    if rules is None:
+        return None
+    # Every rule column is read as text, whatever its "Type of data". SCV
+    # fields are text on the wire: Numeric covers sort codes, account and
+    # phone numbers that must keep their leading zeros and never turn into
+    # floats or scientific notation, and Decimal amounts keep exactly the
+    # precision they were written with. The checks match patterns against
+    # that text, so typed columns would only be turned back into it.
+    return {rule.name: str for rule in rules}
+
+
+def decimal_text(value):
+    """The text of a Decimal cell: numbers as floats, so 90 reads as 90.0
+
+    A column of amounts with blanks in it is a float column to pandas, so
+    the per-cell scripts, which read workbooks with pd.ExcelFile, saw whole
+    amounts that way, and the Decimal check expects the decimal point.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(float(value))
+    return str(value)
+
+
+def excel_converters(rules):
+    """Column name -> function giving the text of a workbook cell, per rule"""
+    if rules is None:
+        return None
+    # Workbook cells can be numbers rather than text, unlike delimited fields
+    return {rule.name: decimal_text if rule.data_type == 'Decimal' else str for rule in rules}
+
+
+def footer_fields(values):
+    """The populated fields of a row, as text"""
+    return [str(value).strip() for value in values
+            if value is not None and str(value).strip() not in ("", "nan")]
+
+
+def is_footer(values):
+    """Whether a row is the FSCS footer: twenty 9s, then perhaps a record count"""
+    fields = footer_fields(values)
+    return bool(fields) and fields[0] == FOOTER
+
+
+def drop_footer(frame):
+    """*frame* without its last row, if that is the footer"""
+    if len(frame) and is_footer(frame.iloc[-1].tolist()):
+        return frame.iloc[:-1]
+    return frame
+
+
+def _without_footer(chunks):
+    # The footer is the last row of the last chunk, so hold each chunk back
+    # until the next one shows it was not the last
+    previous = None
+    for chunk in chunks:
+        if previous is not None:
+            yield previous
+        previous = chunk
+    if previous is not None:
+        previous = drop_footer(previous)
+        if len(previous):
+            yield previous
+
+
+def sniff_delimiter(file_path):
+    """SCV extracts are either comma or pipe delimited; decide from the header"""
+    with open(file_path, newline='') as f:
+        header = f.readline()
+    return '|' if header.count('|') > header.count(',') else ','
+
+
+def scan_records(file_path):
+    """Non-blank records of a delimited file, and whether any spans lines
+
+    Only a newline outside a quoted field ends a record. Quotes inside a
+    field are doubled, so a newline is inside one exactly when an odd number
+    of quotes come before it. Empty lines are skipped wherever they are, as
+    read_csv() skips them. The file is scanned for bytes, a block at a time,
+    without parsing a single field.
+    """
+    records = 0
+    quotes = 0
+    after_break = True
+    spans = False
+    tail = b''
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(SCAN_BLOCK), b''):
+            data = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(data == NEWLINE)
+            quote_marks = np.flatnonzero(data == QUOTE)
+            inside = (np.searchsorted(quote_marks, newlines) + quotes) % 2 == 1
+            spans = spans or bool(inside.any())
+            breaks = newlines[~inside]
+            # A record starts at each byte after a break that does not end a
+            # line itself
+            starts = breaks + 1
+            if after_break:
+                starts = np.concatenate(([0], starts))
+            starts = starts[starts < len(data)]
+            records += int(((data[starts] != NEWLINE) & (data[starts] != RETURN)).sum())
+            after_break = len(breaks) > 0 and breaks[-1] == len(data) - 1
+            quotes = (quotes + len(quote_marks)) % 2
+            tail = (tail + block)[-SCAN_BLOCK:]
+    # Lines of only spaces at the end are not records either
+    trailing = tail[len(tail.rstrip()):].split(b'\n')[1:]
+    return records - sum(1 for line in trailing if line[:1] not in (b'', b'\r')), spans
+
+
+def _cell(value, dtype=None):
+    # Mirror pandas.read_excel: blank cells are NaN, whole floats become ints
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return dtype(value) if dtype is not None else value
+
+
+def read_input(file_path, rules=None, footer=False):
+    """Read a whole SCV/EX file, typing rule columns from the rule set
+
+    With *footer*, a footer row ending the file is dropped.
+    """
+    if Path(file_path).suffix.lower() in DELIMITED_SUFFIXES:
+        frame = pd.read_csv(file_path, sep=sniff_delimiter(file_path), dtype=dtype_map(rules),
+                            **NA_OPTIONS)
+    else:
+        frame = pd.read_excel(file_path, sheet_name=0, converters=excel_converters(rules),
+                              **NA_OPTIONS)
+        # read_csv() skips blank lines; skip blank rows the same way
+        frame = frame.dropna(how="all").reset_index(drop=True)
+    if footer:
+        frame = drop_footer(frame)
+    return compact(frame, rules) if rules is not None else frame
+
+
+def _excel_columns(header):
+    return [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+
+def _excel_frame(block, columns, converters, start):
+    width = len(columns)
+    records = [[_cell(value, dtype) for value, dtype in zip(row[:width], converters)]
+               + [np.nan] * (width - len(row))
+               for row in block]
+    return pd.DataFrame(records, columns=columns, dtype=object,
+                        index=pd.RangeIndex(start, start + len(records)))
+
+
+def _iter_excel_chunks(file_path, to_text, chunksize):
+    # Imported here so that only Excel input pays for loading openpyxl
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _excel_columns(header)
+        converters = [to_text.get(name) for name in columns] if to_text else [None] * len(columns)
+        # pandas skips blank lines, so do the same
+        rows = (row for row in rows if any(value is not None for value in row))
+        start = 0
+        while True:
+            block = list(islice(rows, chunksize))
+            if not block:
+                break
+            yield _excel_frame(block, columns, converters, start)
+            start += len(block)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(file_path, rules=None, chunksize=DEFAULT_CHUNKSIZE, footer=False):
+    """Yield the input file as DataFrames of at most *chunksize* rows
+
+    Row labels carry on from one chunk to the next, so they always match the
+    row's position in the whole file. With *footer*, a footer row ending the
+    file is dropped.
+    """
+    suffix = Path(file_path).suffix.lower()
+    dtypes = dtype_map(rules)
+    if suffix in DELIMITED_SUFFIXES:
+        chunks = pd.read_csv(file_path, sep=sniff_delimiter(file_path), dtype=dtypes,
+                             chunksize=chunksize, **NA_OPTIONS)
+    elif suffix in EXCEL_SUFFIXES:
+        chunks = _iter_excel_chunks(file_path, excel_converters(rules), chunksize)
+    else:
+        # Legacy .xls workbooks cannot be read incrementally
+        new_data_df = read_input(file_path, rules)
+        chunks = (new_data_df.iloc[start:start + chunksize]
+                  for start in range(0, len(new_data_df), chunksize))
+    if footer:
+        chunks = _without_footer(chunks)
+    for chunk in chunks:
+        yield compact(chunk, rules) if rules is not None else chunk
+
+
+def read_header(file_path):
+    """The column names of a file, reading only its first row"""
+    suffix = Path(file_path).suffix.lower()
+    if suffix in DELIMITED_SUFFIXES:
+        return list(pd.read_csv(file_path, sep=sniff_delimiter(file_path), nrows=0).columns)
+    if suffix in EXCEL_SUFFIXES:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            header = next(workbook.worksheets[0].iter_rows(values_only=True), ())
+        finally:
+            workbook.close()
+        return _excel_columns(header)
+    return list(pd.read_excel(file_path, sheet_name=0, nrows=0).columns)
+
+
+def _sample_delimited(file_path, dtypes, rows, strata, rng):
+    # Seek to random offsets in equal byte ranges of the file and take the
+    # line after the one each lands in. That line is as likely to be long as
+    # short, so the mean length of the lines taken also estimates how many
+    # rows each range holds. Strata are visited in random order, so the
+    # sample covers the whole file however soon it is stopped.
+    sep = sniff_delimiter(file_path)
+    records, spans = scan_records(file_path)
+    if spans:
+        # A seek can land inside a quoted field, so parse the file instead
+        yield from _sample_parsed(file_path, sep, dtypes, records - 1, rows, strata, rng)
+        return
+    size = os.path.getsize(file_path)
+    per_stratum = -(-rows // strata)
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        bounds = np.linspace(start, size, strata + 1).astype(np.int64)
+        for stratum in rng.permutation(strata):
+            low, high = bounds[stratum], bounds[stratum + 1]
+            if high <= low:
+                continue
+            taken = {}
+            for offset in np.sort(rng.integers(low, high, per_stratum)):
+                f.seek(max(offset - 1, 0))
+                f.readline()
+                position = f.tell()
+                if position < high and position not in taken:
+                    line = f.readline()
+                    if line.strip():
+                        taken[position] = line
+            if not taken:
+                continue
+            lines = list(taken.values())
+            frame = pd.read_csv(io.BytesIO(header + b"".join(lines)), sep=sep, dtype=dtypes,
+                                **NA_OPTIONS)
+            mean_length = sum(map(len, lines)) / len(lines)
+            yield frame, int(round((high - low) / mean_length))
+
+
+def _sample_parsed(file_path, sep, dtypes, total, rows, strata, rng):
+    # The rows are streamed once through read_csv() and only the drawn row
+    # numbers kept; stratum sizes are exact
+    bounds = np.linspace(0, max(total, 0), strata + 1).astype(np.int64)
+    ranges = [(low, high) for low, high in zip(bounds[:-1], bounds[1:]) if high > low]
+    drawn = np.concatenate([rng.choice(np.arange(low, high), min(-(-rows // strata), high - low),
+                                       replace=False) for low, high in ranges] or [[]])
+    reader = pd.read_csv(file_path, sep=sep, dtype=dtypes, chunksize=DEFAULT_CHUNKSIZE,
+                         **NA_OPTIONS)
+    with reader:
+        kept = pd.concat([chunk[chunk.index.isin(drawn)] for chunk in reader])
+    for stratum in rng.permutation(len(ranges)):
+        low, high = ranges[stratum]
+        frame = kept[(kept.index >= low) & (kept.index < high)]
+        if len(frame):
+            yield frame, int(high - low)
+
+
+def _sample_excel(file_path, to_text, rows, strata, rng):
+    # Excel cannot be read from the middle, so the rows are streamed once and
+    # the drawn row numbers kept, one stratum of the sheet after another
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = sheet.max_row
+        if total is None:
+            # No stored dimensions; count the rows instead
+            total = sum(1 for _ in sheet.iter_rows(values_only=True))
+        total -= 1  # the header
+        rows_iter = sheet.iter_rows(values_only=True)
+        columns = _excel_columns(next(rows_iter, ()))
+        converters = [to_text.get(name) for name in columns] if to_text else [None] * len(columns)
+        bounds = np.linspace(0, max(total, 0), strata + 1).astype(np.int64)
+        position = 0
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            if high <= low:
+                continue
+            drawn = set(rng.choice(np.arange(low, high), min(-(-rows // strata), high - low),
+                                   replace=False).tolist())
+            block, index = [], []
+            for row in islice(rows_iter, high - position):
+                if position in drawn and any(value is not None for value in row):
+                    block.append(row)
+                    index.append(position)
+                position += 1
+            if block:
+                frame = _excel_frame(block, columns, converters, 0)
+                frame.index = pd.Index(index)
+                yield frame, int(high - low)
+    finally:
+        workbook.close()
+
+
+def sample_rows(file_path, rules=None, rows=10_000, strata=20, seed=0, footer=False):
+    """A stratified random sample of about *rows* data rows of a file
+
+    The file is split into *strata* equal parts and the same number of rows
+    drawn at random from each. Yields one (frame, rows in its stratum) pair
+    per stratum. Delimited files are sampled by seeking rather than read, so
+    their stratum sizes are estimates and their rows are labelled from 0,
+    unless a quoted field spans lines; those files are read through once.
+    With *footer*, a sampled footer row is left out.
+    """
+    rng = np.random.default_rng(seed)
+    suffix = Path(file_path).suffix.lower()
+    dtypes = dtype_map(rules)
+    if suffix in DELIMITED_SUFFIXES:
+        samples = _sample_delimited(file_path, dtypes, rows, strata, rng)
+    elif suffix in EXCEL_SUFFIXES:
+        samples = _sample_excel(file_path, excel_converters(rules), rows, strata, rng)
+    else:
+        samples = _sample_frame(read_input(file_path, rules), rows, strata, rng)
+    for frame, size in samples:
+        if footer:
+            frame = frame[[not is_footer(row) for row in frame.itertuples(index=False)]]
+        yield (compact(frame, rules) if rules is not None else frame), size
+
+
+def _sample_frame(frame, rows, strata, rng):
+    for part in np.array_split(np.arange(len(frame)), strata):
+        if len(part):
+            drawn = np.sort(rng.choice(part, min(-(-rows // strata), len(part)), replace=False))
+            yield frame.iloc[drawn], len(part)
@@ -0,0 +1,128 @@
+# Currency conversion reconciliation.
+#
+# For every account held in a currency other than GBP the declared
+# account_balance_in_sterling should equal account_balance_in_original_currency
+# times exchange_rate. Amounts are parsed into Decimal, once per distinct
+# value, and the whole frame is reconciled in one pass, so there is no float
+# rounding to allow for: the tolerance is a real one, in pounds. The declared
+# rates can also be cross-checked against a reference rate table, a CSV of
+# currency,rate (pounds per unit of the currency).
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+from .patterns import per_value
+
+# Allow for rounding differences
+TOLERANCE = Decimal("0.01")
+# Relative difference allowed between a declared and a reference rate
+RATE_TOLERANCE = Decimal("0.005")
+
+# Upper bounds, in pounds, of the bands the summary counts differences in
+MAGNITUDE_BANDS = (Decimal("0.01"), Decimal("1"), Decimal("100"), Decimal("1000"),
+                   Decimal("85000"))
+
+
+def to_decimal(value):
+    """Decimal of a text amount, or None if it is not a finite number"""
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _decimals(values):
+    return per_value(to_decimal, values, dtype=object)
+
+
+def load_fx_rates(path):
+    """Reference rates from a currency,rate CSV, as {currency: Decimal}"""
+    table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    table.columns = [column.strip().lower() for column in table.columns]
+    rates = {}
+    for currency, rate in zip(table["currency"], table["rate"]):
+        rate = to_decimal(rate)
+        if currency.strip() and rate is not None:
+            rates[currency.strip().upper()] = rate
+    return rates
+
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return pd.Series(np.nan, index=frame.index, dtype=object)
+    return frame[name]
+
+
+def reconcile(frame, tolerance=TOLERANCE, fx_rates=None, rate_tolerance=RATE_TOLERANCE):
+    """One row per foreign-currency account whose amounts can be compared
+
+    Columns: currency, original, exchange_rate, expected and declared
+    sterling balances, difference (declared - expected) and mismatch, plus
+    reference_rate and rate_mismatch when *fx_rates* (a {currency: rate}
+    dict or the path of a rates CSV) is given. Rows with an amount that is
+    not a number are left out; the numeric-field checks report those.
+    """
+    currency = _column(frame, "currency_of_account")
+    sterling = _column(frame, "account_balance_in_sterling")
+    foreign = (sterling.notna() & currency.notna() & (currency != "GBP")).to_numpy(dtype=bool)
+    rows = frame.index[foreign]
+    reconciled = pd.DataFrame({
+        "currency": currency[foreign].astype(object),
+        "original": _decimals(_column(frame, "account_balance_in_original_currency")[foreign]),
+        "exchange_rate": _decimals(_column(frame, "exchange_rate")[foreign]),
+        "declared": _decimals(sterling[foreign]),
+    }, index=rows)
+    reconciled = reconciled[reconciled[["original", "exchange_rate", "declared"]]
+                            .notna().all(axis=1)]
+
+    original = reconciled["original"].to_numpy()
+    rate = reconciled["exchange_rate"].to_numpy()
+    declared = reconciled["declared"].to_numpy()
+    reconciled["expected"] = original * rate
+    reconciled["difference"] = declared - reconciled["expected"].to_numpy()
+    reconciled["mismatch"] = np.abs(reconciled["difference"].to_numpy()) > tolerance
+
+    if fx_rates is not None:
+        if not isinstance(fx_rates, dict):
+            fx_rates = load_fx_rates(fx_rates)
+        reference = reconciled["currency"].str.strip().str.upper().map(fx_rates)
+        reconciled["reference_rate"] = reference.astype(object)
+        known = reference.notna().to_numpy()
+        rate_mismatch = np.zeros(len(reconciled), dtype=bool)
+        rate_mismatch[known] = (np.abs(rate[known] - reference[known].to_numpy())
+                                > reference[known].to_numpy() * rate_tolerance)
+        reconciled["rate_mismatch"] = rate_mismatch
+    return reconciled
+
+
+def mismatch_summary(reconciled):
+    """Per currency: accounts compared, mismatches, and the size of the differences
+
+    The difference columns count mismatching accounts by magnitude band,
+    in pounds, alongside the largest and total absolute difference.
+    """
+    magnitude = reconciled["difference"].map(abs)
+    bands = pd.cut(magnitude.astype(float), [0.0] + [float(b) for b in MAGNITUDE_BANDS]
+                   + [np.inf], include_lowest=True,
+                   labels=[f"<= {b}" for b in MAGNITUDE_BANDS] + [f"> {MAGNITUDE_BANDS[-1]}"])
+    mismatched = reconciled["mismatch"].to_numpy(dtype=bool)
+    groups = reconciled["currency"]
+    summary = pd.DataFrame({
+        "accounts": groups.value_counts(),
+        "mismatches": groups[mismatched].value_counts(),
+        "max_difference": magnitude[mismatched].groupby(groups[mismatched]).max(),
+        "total_difference": magnitude[mismatched].groupby(groups[mismatched]).sum(),
+    })
+    if "rate_mismatch" in reconciled:
+        rate_mismatched = reconciled["rate_mismatch"].to_numpy(dtype=bool)
+        summary["rate_mismatches"] = groups[rate_mismatched].value_counts()
+    by_band = pd.crosstab(groups[mismatched], bands[mismatched]) if mismatched.any() else None
+    if by_band is not None:
+        summary = summary.join(by_band)
+    counts = [column for column in summary.columns
+              if column not in ("max_difference", "total_difference")]
+    summary[counts] = summary[counts].fillna(0).astype(int)
+    summary.index.name = "currency"
+    return summary.sort_index()
@@ -0,0 +1,184 @@
+# Compiled rule table for the "Data inputs" sheet of fscs_scv_tables.xlsx.
+#
+# The sheet is turned into one ColumnRule per "Name in File" once per run, so
+# validating a cell is a dict lookup rather than a scan of the rules frame.
+# The compiled rules are also cached as JSON next to the workbook, so the
+# workbook itself is only parsed again after it changes.
+#
+# A "Type of data" the code does not know can be declared in the sheet by
+# filling in its optional "Pattern" column; its cells are then checked
+# against that pattern, in every profile. The declaration belongs to the rule
+# set compiled from that sheet: patterns.VALIDATORS is never touched. A
+# Pattern given for a type the code already knows is checked as well as the
+# code's own check, never instead of it.
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from .error_codes import register_error_message
+from .patterns import Validator
+
+RULES_FILE = "fscs_scv_tables.xlsx"
+RULES_SHEET = "Data inputs"
+PATTERN_COLUMN = "Pattern"
+# Bump when the cached form of a rule changes
+RULES_CACHE_VERSION = 3
+
+
+def rules_cache_path(path):
+    """fscs_scv_tables.xlsx -> .fscs_scv_tables.xlsx.rules.json alongside it"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.rules.json")
+
+
+def file_digest(path):
+    """SHA-256 of the file at *path*, as hex"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _read_rules_cache(path):
+    """Cached rule records for the workbook at *path*, or None if stale
+
+    A matching size and mtime is trusted as is; otherwise the workbook's
+    hash decides, so a touched but unchanged workbook is not re-parsed.
+    """
+    try:
+        with open(rules_cache_path(path)) as f:
+            cache = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if cache.get("version") != RULES_CACHE_VERSION:
+        return None
+    if cache["size"] == stat.st_size and cache["mtime_ns"] == stat.st_mtime_ns:
+        return cache["rules"]
+    if cache["sha256"] == file_digest(path):
+        _write_rules_cache(path, cache["rules"], cache["sha256"])
+        return cache["rules"]
+    return None
+
+
+def _write_rules_cache(path, records, sha256=None):
+    stat = os.stat(path)
+    cache = {
+        "version": RULES_CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256 or file_digest(path),
+        "rules": records,
+    }
+    cache_file = rules_cache_path(path)
+    partial = cache_file.with_name(cache_file.name + ".partial")
+    try:
+        with open(partial, 'w') as f:
+            json.dump(cache, f)
+        os.replace(partial, cache_file)
+    except OSError:
+        pass  # a read-only rules folder just means no cache
+
+
+class ColumnRule:
+    """Validation settings for one column of an SCV/EX file"""
+
+    __slots__ = ("name", "max_length", "data_type", "mandatory", "pattern", "declared")
+
+    def __init__(self, name, max_length, data_type, mandatory, pattern=None):
+        self.name = name
+        self.max_length = max_length
+        self.data_type = data_type
+        self.mandatory = mandatory
+        # Set when the rules sheet declares the pattern for data_type itself
+        self.pattern = pattern
+        self.declared = Validator(data_type, pattern) if pattern is not None else None
+
+    def __repr__(self):
+        pattern = f", pattern={self.pattern!r}" if self.pattern is not None else ""
+        return (f"ColumnRule({self.name!r}, max_length={self.max_length!r}, "
+                f"data_type={self.data_type!r}, mandatory={self.mandatory!r}{pattern})")
+
+
+def _rule(name, max_length, data_type, mandatory, pattern):
+    if pattern is not None:
+        # Its failures need an error code like any other
+        register_error_message(f"Invalid {data_type} Format")
+    return ColumnRule(name, max_length, data_type, mandatory, pattern)
+
+
+class RuleSet:
+    """The "Data inputs" rules keyed by column name"""
+
+    def __init__(self, rules):
+        self._rules = {rule.name: rule for rule in rules}
+
+    @classmethod
+    def from_frame(cls, rules_df):
+        """Compile a rules frame; the first row wins when a name repeats"""
+        patterns = (rules_df[PATTERN_COLUMN] if PATTERN_COLUMN in rules_df
+                    else [None] * len(rules_df))
+        rules = {}
+        for name, max_length, data_type, mandate, pattern in zip(
+                rules_df["Name in File"], rules_df["Max Number of Characters"],
+                rules_df["Type of data"], rules_df["Mandate or not"], patterns):
+            if name in rules:
+                continue
+            data_type = data_type if pd.notna(data_type) else None
+            rules[name] = _rule(
+                name,
+                int(max_length) if pd.notna(max_length) else None,
+                data_type,
+                mandate == "Yes",
+                pattern if data_type is not None and pd.notna(pattern) else None,
+            )
+        return cls(rules.values())
+
+    @classmethod
+    def from_records(cls, records):
+        """Rebuild a rule set from to_records() output"""
+        return cls(_rule(*record) for record in records)
+
+    def to_records(self):
+        return [[rule.name, rule.max_length, rule.data_type, rule.mandatory, rule.pattern]
+                for rule in self]
+
+    @classmethod
+    def load(cls, path=RULES_FILE):
+        """Compile the rules sheet of the workbook at *path*
+
+        Reads the JSON cache beside the workbook when it is current, and
+        only parses the workbook (and refreshes the cache) when it is not.
+        """
+        records = _read_rules_cache(path)
+        if records is not None:
+            return cls.from_records(records)
+        rules = cls.from_frame(pd.read_excel(path, sheet_name=RULES_SHEET))
+        _write_rules_cache(path, rules.to_records())
+        return rules
+
+    @classmethod
+    def coerce(cls, rules):
+        """Accept either a compiled RuleSet or a raw rules frame"""
+        if isinstance(rules, cls):
+            return rules
+        return cls.from_frame(rules)
+
+    def get(self, name):
+        return self._rules.get(name)
+
+    def __contains__(self, name):
+        return name in self._rules
+
+    def __getitem__(self, name):
+        return self._rules[name]
+
+    def __iter__(self):
+        return iter(self._rules.values())
+
+    def __len__(self):
+        return len(self._rules)
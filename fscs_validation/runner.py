@@ -0,0 +1,82 @@
+# Parallel batch runner for directories of SCV/EX files.
+#
+# Files are spread across a process pool. Each worker compiles the rules
+# sheet once when it starts and reuses it for every file it is handed, and
+# every file gets a status record whether it succeeded or not.
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from .rules import RuleSet
+
+# Set in each worker process by _init_worker
+_worker_job = None
+_worker_rules = None
+
+
+def worker_count():
+    """Workers to start: $FSCS_WORKERS if set, otherwise one per CPU"""
+    workers = os.environ.get("FSCS_WORKERS")
+    return int(workers) if workers else os.cpu_count()
+
+
+def _init_worker(job, rules_path):
+    global _worker_job, _worker_rules
+    _worker_job = job
+    _worker_rules = RuleSet.load(rules_path)
+
+
+def run_job(input_path, output_path):
+    """Run the worker's job on one file; returns its status record"""
+    started = time.perf_counter()
+    status = {"file": input_path, "output": output_path}
+    try:
+        status["rows"] = _worker_job(input_path, _worker_rules, output_path)
+        status["status"] = "success"
+    except Exception:
+        status["rows"] = None
+        status["status"] = "failure"
+        status["error"] = traceback.format_exc()
+    status["duration"] = time.perf_counter() - started
+    return status
+
+
+def run_batch(jobs, job, rules_path, workers=None):
+    """Run job(input_path, rules, output_path) for every (input, output) pair
+
+    job must be a module-level function (or a partial of one) returning the
+    number of records it validated. Returns one status dict per job, in the
+    order given.
+    """
+    with worker_pool(job, rules_path, workers) as pool:
+        futures = [pool.submit(run_job, input_path, output_path)
+                   for input_path, output_path in jobs]
+        return [future.result() for future in futures]
+
+
+def worker_pool(job, rules_path, workers=None):
+    """Process pool whose workers each compile the rules once and then run
+    run_job(input_path, output_path) with *job* for every file submitted
+    """
+    return ProcessPoolExecutor(max_workers=workers or worker_count(), initializer=_init_worker,
+                               initargs=(job, rules_path))
+
+
+def print_status(status):
+    name = os.path.basename(status["file"])
+    if status["status"] == "success":
+        print(f"{name:<50} success {status['rows']:>10} rows {status['duration']:8.1f}s")
+    else:
+        print(f"{name:<50} FAILURE {'':>15} {status['duration']:8.1f}s")
+
+
+def print_summary(summary):
+    """Print one line per file, then the traceback of every failure"""
+    for status in summary:
+        print_status(status)
+    for status in summary:
+        if status["status"] != "success":
+            print(f"\nError processing {os.path.basename(status['file'])}:\n{status['error']}")
+    succeeded = sum(status["status"] == "success" for status in summary)
+    print(f"\n{succeeded}/{len(summary)} files processed successfully")
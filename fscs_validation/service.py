@@ -0,0 +1,325 @@
+# Validation service: upload an SCV/EX file over HTTP, get its errors back.
+#
+# python -m fscs_validation.service --port 8080 [--unix /run/fscs.sock]
+#
+#   POST /validate?name=SCV_0001.csv&profile=batch2   body: the file
+#   GET  /health
+#
+# A plain asyncio HTTP/1.1 server, on TCP and/or a local Unix socket. The
+# body (Content-Length or chunked, so a CSV can be streamed as it is
+# produced) is spooled to disk and validated chunk by chunk in a process
+# pool, off the event loop. The worker appends each chunk's error records to
+# a spool file that the server tails, so the response, one JSON line per
+# error ending with a summary line, streams back while the file is still
+# being validated. Validations beyond the pool size queue; beyond max_queued
+# more, submissions are turned away with 503 until a slot frees up. Slow
+# readers are handled by awaiting drain() on every write.
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from .error_codes import error_message
+from .pipeline import iter_file_errors, load_rules
+from .profiles import get_profile
+from .readers import DEFAULT_CHUNKSIZE, INPUT_SUFFIXES
+from .rules import RULES_FILE
+from .runner import worker_count
+
+PORT = 8080
+# Uploads waiting for a worker before new ones are refused
+MAX_QUEUED = 32
+# Largest upload accepted, in bytes
+MAX_UPLOAD = 2 << 30
+# Seconds between looks at a running validation's spool file
+TAIL_INTERVAL = 0.05
+BLOCK_SIZE = 1 << 20
+RETRY_AFTER = 5
+
+
+def _validate_to_spool(file_path, rules_path, profile, spool_path, chunksize):
+    """Worker: write the file's error records to spool_path as JSON lines"""
+    rules = load_rules(rules_path)
+    records = failing = 0
+    with open(spool_path, "w") as spool:
+        for chunk, report in iter_file_errors(file_path, rules, profile, chunksize):
+            lines = [json.dumps({"row": int(row), "column": str(column), "code": code,
+                                 "error": error_message(code)})
+                     for row, column, codes in report.records() for code in codes]
+            if lines:
+                spool.write("\n".join(lines) + "\n")
+                spool.flush()
+            records += len(chunk)
+            failing += len(report)
+    return {"records": records, "failing_cells": failing}
+
+
+class HttpError(Exception):
+    def __init__(self, status, reason, message):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+async def _read_head(reader):
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Bad Request", "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    return method.upper(), url.path, dict(parse_qsl(url.query)), headers
+
+
+async def _spool_body(reader, headers, path, limit=MAX_UPLOAD):
+    """Copy the request body to *path*, a block at a time"""
+    size = 0
+    with open(path, "wb") as f:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                length = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if length == 0:
+                    # Skip any trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                size += length
+                if size > limit:
+                    raise HttpError(413, "Payload Too Large",
+                                    f"Uploads are limited to {limit} bytes")
+                f.write(await reader.readexactly(length))
+                await reader.readexactly(2)
+        else:
+            remaining = int(headers.get("content-length", 0))
+            if remaining > limit:
+                raise HttpError(413, "Payload Too Large", f"Uploads are limited to {limit} bytes")
+            while remaining:
+                block = await reader.read(min(remaining, BLOCK_SIZE))
+                if not block:
+                    raise HttpError(400, "Bad Request", "Body shorter than Content-Length")
+                f.write(block)
+                remaining -= len(block)
+
+
+def _chunk(data):
+    return f"{len(data):X}\r\n".encode() + data + b"\r\n"
+
+
+class ValidationService:
+    """Validates uploaded files in a process pool and streams back their errors"""
+
+    def __init__(self, rules_path=RULES_FILE, profile="batch", workers=None,
+                 max_queued=MAX_QUEUED, chunksize=DEFAULT_CHUNKSIZE):
+        self.rules_path = rules_path
+        self.profile = get_profile(profile).name
+        self.workers = workers or worker_count()
+        self.max_queued = max_queued
+        self.chunksize = chunksize
+        self.active = 0
+        self.queued = 0
+        self._pool = None
+        self._slots = None
+
+    async def start(self, host="127.0.0.1", port=PORT, unix_path=None):
+        """Start listening; returns the asyncio servers"""
+        # Compile the rules up front, so workers find the rules cache current
+        load_rules(self.rules_path)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.workers)
+        servers = []
+        if port is not None:
+            servers.append(await asyncio.start_server(self.handle, host, port))
+        if unix_path is not None:
+            servers.append(await asyncio.start_unix_server(self.handle, unix_path))
+        return servers
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        try:
+            head = await _read_head(reader)
+            if head is None:
+                return
+            method, path, params, headers = head
+            if method == "GET" and path == "/health":
+                await self._respond_json(writer, 200, "OK", {
+                    "status": "ok", "workers": self.workers, "active": self.active,
+                    "queued": self.queued})
+            elif method == "POST" and path == "/validate":
+                await self._validate(reader, writer, params, headers)
+            else:
+                raise HttpError(404, "Not Found", f"No route for {method} {path}")
+        except HttpError as e:
+            await self._respond_json(writer, e.status, e.reason, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _validate(self, reader, writer, params, headers):
+        name = os.path.basename(params.get("name", "upload.csv"))
+        if not name.lower().endswith(INPUT_SUFFIXES):
+            raise HttpError(415, "Unsupported Media Type",
+                            f"name must end with one of {', '.join(INPUT_SUFFIXES)}")
+        try:
+            profile = get_profile(params.get("profile", self.profile)).name
+        except ValueError as e:
+            raise HttpError(400, "Bad Request", str(e)) from None
+        if self.active + self.queued >= self.workers + self.max_queued:
+            raise HttpError(503, "Service Unavailable", "Too many submissions; retry shortly")
+        if headers.get("expect", "").lower() == "100-continue":
+            # The client waits for this before sending the body, so a refused
+            # upload is never transferred
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+        tmp = tempfile.mkdtemp(prefix="fscs-")
+        self.queued += 1
+        queued = True
+        try:
+            file_path = os.path.join(tmp, name)
+            await _spool_body(reader, headers, file_path)
+            async with self._slots:
+                self.queued -= 1
+                queued = False
+                self.active += 1
+                try:
+                    await self._stream_errors(writer, file_path, profile,
+                                              os.path.join(tmp, "errors.jsonl"))
+                finally:
+                    self.active -= 1
+        finally:
+            if queued:
+                self.queued -= 1
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    async def _stream_errors(self, writer, file_path, profile, spool_path):
+        open(spool_path, "w").close()
+        job = asyncio.wrap_future(self._pool.submit(
+            _validate_to_spool, file_path, self.rules_path, profile, spool_path, self.chunksize))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        partial = b""
+        with open(spool_path, "rb") as spool:
+            while True:
+                finished = job.done()
+                data = partial + spool.read(BLOCK_SIZE)
+                complete, _, partial = data.rpartition(b"\n")
+                if complete:
+                    writer.write(_chunk(complete + b"\n"))
+                    await writer.drain()
+                elif finished:
+                    break
+                else:
+                    await asyncio.sleep(TAIL_INTERVAL)
+        try:
+            summary = {"summary": await job}
+        except Exception as e:
+            summary = {"error": f"{type(e).__name__}: {e}"}
+        writer.write(_chunk(json.dumps(summary).encode() + b"\n") + _chunk(b""))
+        await writer.drain()
+
+    async def _respond_json(self, writer, status, reason, body):
+        data = json.dumps(body).encode() + b"\n"
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n".encode()
+                     + (f"Retry-After: {RETRY_AFTER}\r\n".encode() if status == 503 else b"")
+                     + b"\r\n" + data)
+        await writer.drain()
+
+
+async def _read_status(reader):
+    """Status code of the next response, skipping its headers"""
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    return int(status_line.split()[1])
+
+
+async def submit(file_path, host="127.0.0.1", port=PORT, unix_path=None, profile=None):
+    """Upload *file_path* to a running service; yields each JSON line it returns
+
+    The error records come first, then a {"summary": ...} (or {"error": ...})
+    line. Raises RuntimeError if the service refuses the file.
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        query = f"name={os.path.basename(file_path)}"
+        if profile is not None:
+            query += f"&profile={profile}"
+        writer.write(f"POST /validate?{query} HTTP/1.1\r\nHost: {host}\r\n"
+                     f"Content-Length: {os.path.getsize(file_path)}\r\n"
+                     f"Expect: 100-continue\r\n\r\n".encode())
+        status = await _read_status(reader)
+        if status == 100:
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                    writer.write(block)
+                    await writer.drain()
+            status = await _read_status(reader)
+        if status != 200:
+            body = await reader.read()
+            raise RuntimeError(f"{status}: {json.loads(body).get('error')}")
+        buffer = b""
+        while True:
+            length = int((await reader.readline()).strip() or b"0", 16)
+            if length == 0:
+                break
+            buffer += await reader.readexactly(length)
+            await reader.readexactly(2)
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=PORT, unix_path=None):
+    servers = await service.start(host, port, unix_path)
+    try:
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fscs_validation.service",
+                                     description="Serve SCV/EX file validation over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", dest="unix_path", help="also listen on this Unix socket")
+    parser.add_argument("--profile", default="batch", help="profile used when none is given")
+    parser.add_argument("--rules", default=RULES_FILE, help="rules workbook")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per CPU)")
+    parser.add_argument("--max-queued", type=int, default=MAX_QUEUED)
+    args = parser.parse_args(argv)
+    service = ValidationService(args.rules, args.profile, args.workers, args.max_queued)
+    print(f"Serving on http://{args.host}:{args.port}"
+          + (f" and {args.unix_path}" if args.unix_path else ""))
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
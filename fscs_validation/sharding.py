@@ -0,0 +1,144 @@
+# Row-sharded validation of a single file across processes.
+#
+# Every per-cell rule only looks at its own row, so a frame can be cut into
+# shards and validated in parallel. The cross-row checks (duplicate account
+# numbers, SCV records and addresses, the product hierarchy and the
+# per-customer compensation limit) cannot: a row is only a duplicate if an
+# earlier row, possibly in another shard, has the same key, and a customer's
+# accounts may be spread over every shard. Workers therefore record the keys they would have checked
+# and report no cross-row failures. The merge phase replays those keys in
+# file order through a ValidationState, exactly as a sequential run does,
+# and revalidates just the flagged rows of the affected columns.
+#
+# Workers send back error masks, so a code must mean the same message in
+# every process. A worker started with spawn only knows the built-in
+# messages; the ones registered at run time (types declared in the rules
+# sheet) are registered again, in the same order, when it starts.
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .columnar import ErrorMasks, ValidationState, validate_columns
+from .error_codes import register_error_message, registered_messages
+
+# Cross-row key kind -> the column whose results it feeds
+CROSS_ROW_COLUMNS = {
+    "account_number": "account_number",
+    "single_customer_view_record": "single_customer_view_record",
+    "address": "address_line_1",
+    "products": "product_type",
+    "customers": "account_balance_in_sterling",
+}
+
+# Below this many rows per worker a file is validated in-process
+MIN_SHARD_ROWS = 10_000
+
+
+class DeferredState:
+    """Records cross-row keys in place of checking them"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def duplicated(self, kind, keys):
+        self.keys.setdefault(kind, []).append(keys)
+        return np.zeros(len(keys), dtype=bool)
+
+    def outranked(self, priorities):
+        self.keys.setdefault("products", []).append(priorities)
+        return np.zeros(len(priorities), dtype=int)
+
+    def over_limit(self, keys, frame):
+        self.keys.setdefault("customers", []).append(keys)
+        return np.zeros(len(keys), dtype=bool)
+
+
+class ReplayState:
+    """Answers cross-row checks from flags resolved in the merge phase"""
+
+    def __init__(self, flags):
+        self.flags = flags
+
+    def duplicated(self, kind, keys):
+        return self.flags[kind].reindex(keys.index, fill_value=False).to_numpy()
+
+    def outranked(self, priorities):
+        return self.flags["products"].reindex(priorities.index, fill_value=0).to_numpy()
+
+    def over_limit(self, keys, frame):
+        return self.flags["customers"].reindex(keys.index, fill_value=False).to_numpy()
+
+
+def _init_worker(messages):
+    for message in messages:
+        register_error_message(message)
+
+
+def validate_row_local(frame, rules, profile, is_exclusion_file=False):
+    """Results with every cross-row check passed, and the keys it skipped"""
+    state = DeferredState()
+    results = validate_columns(frame, rules, profile, state, is_exclusion_file)
+    return results, {kind: pd.concat(keys) for kind, keys in state.keys.items()}
+
+
+def _resolve(recorded, frame):
+    """Check the keys of every shard, in shard order, against one another
+
+    Customer totals are taken over *frame*, the whole file.
+    """
+    state = ValidationState()
+    flags = {}
+    for kind in CROSS_ROW_COLUMNS:
+        keys = [shard_keys[kind] for shard_keys in recorded if kind in shard_keys]
+        if not keys:
+            continue
+        keys = pd.concat(keys)
+        if kind == "products":
+            flags[kind] = pd.Series(state.outranked(keys), index=keys.index)
+        elif kind == "customers":
+            flags[kind] = pd.Series(state.over_limit(keys, frame), index=keys.index)
+        else:
+            flags[kind] = pd.Series(state.duplicated(kind, keys), index=keys.index)
+    return flags
+
+
+def merge_cross_row(frame, results, recorded, rules, profile, is_exclusion_file=False):
+    """Apply the cross-row checks to row-local *results*, in place
+
+    *recorded* is the list of key dicts from validate_row_local(), in file
+    order. Only rows that actually fail a cross-row check are redone.
+    """
+    flags = _resolve(recorded, frame)
+    flagged = [kind_flags.index[kind_flags.to_numpy() > 0] for kind_flags in flags.values()]
+    if flagged:
+        rows = frame.index[frame.index.isin(flagged[0].append(flagged[1:]))]
+        if len(rows):
+            redone = validate_columns(frame.loc[rows], rules, profile, ReplayState(flags),
+                                      is_exclusion_file,
+                                      columns=[CROSS_ROW_COLUMNS[kind] for kind in flags])
+            results.update(redone)
+    return results
+
+
+def validate_sharded(frame, rules, profile, workers=None, is_exclusion_file=False):
+    """validate_columns() spread over *workers* processes
+
+    The result is identical to a sequential run, down to which occurrence of
+    a duplicate is the one flagged. Small frames, or workers of None or 1,
+    are validated in-process.
+    """
+    shard_count = min(workers or 1, len(frame) // MIN_SHARD_ROWS)
+    if shard_count <= 1:
+        return validate_columns(frame, rules, profile, is_exclusion_file=is_exclusion_file)
+
+    bounds = np.linspace(0, len(frame), shard_count + 1, dtype=int)
+    shards = [frame.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=shard_count, initializer=_init_worker,
+                             initargs=(registered_messages(),)) as pool:
+        outputs = list(pool.map(validate_row_local, shards, repeat(rules), repeat(profile),
+                                repeat(is_exclusion_file)))
+    results = ErrorMasks.concat([shard_results for shard_results, _ in outputs])
+    return merge_cross_row(frame, results, [shard_keys for _, shard_keys in outputs],
+                           rules, profile, is_exclusion_file)
@@ -0,0 +1,157 @@
+# File structure checks that read only the ends of a file.
+#
+# An SCV/EX file is a header row naming its columns, the records, and a
+# footer row of twenty 9s. The footer may carry the number of records as its
+# next field (a record-count trailer), which must then match the records in
+# the file. Only the first and last rows are read: delimited files are
+# read backwards from the end a block at a time, and workbooks give their
+# last row number from the sheet dimensions in openpyxl's read-only mode, so
+# the checks take milliseconds and run before any validation. Counting the
+# records for a trailer counts the rows the readers yield, skipping blank
+# ones: for a delimited file that is a scan for the newlines outside quoted
+# fields, without parsing a single field (see readers.scan_records), and for
+# a workbook a pass over its rows.
+import os
+from pathlib import Path
+
+from .readers import (
+    DELIMITED_SUFFIXES, EXCEL_SUFFIXES, FOOTER, footer_fields, read_header, scan_records,
+    sniff_delimiter,
+)
+
+MISSING_FOOTER = "Missing or invalid file footer (20 repeated '9's)"
+BLOCK_SIZE = 64 * 1024
+
+
+class FileStructureError(ValueError):
+    """A file too malformed to validate"""
+
+
+def check_header(columns, rules):
+    """Rule columns missing from a header, the mandatory ones, and unknown columns"""
+    present = set(columns)
+    missing = [rule.name for rule in rules if rule.name not in present]
+    mandatory = [rule.name for rule in rules if rule.name not in present and rule.mandatory]
+    unexpected = [name for name in columns if name not in rules]
+    return missing, mandatory, unexpected
+
+
+def last_line(file_path):
+    """The last non-blank line of a text file, read backwards from the end"""
+    with open(file_path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b''
+        while position > 0:
+            step = min(BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            stripped = tail.rstrip()
+            if b'\n' in stripped:
+                return stripped.rsplit(b'\n', 1)[1].decode(errors='replace').strip()
+        return tail.strip().decode(errors='replace') or None
+
+
+def _blank(values):
+    # The readers skip rows without a single value
+    return all(value is None for value in values)
+
+
+def _last_excel_row(file_path):
+    """The values of the last non-blank row of a workbook's first sheet"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        last = sheet.max_row
+        values = ()
+        if last:
+            values = next(sheet.iter_rows(min_row=last, max_row=last, values_only=True), ())
+        if _blank(values):
+            # No stored dimensions, or blank rows at the end: look at every row
+            for row in sheet.iter_rows(values_only=True):
+                if not _blank(row):
+                    values = row
+        return list(values)
+    finally:
+        workbook.close()
+
+
+def count_excel_rows(file_path):
+    """Non-blank rows of a workbook's first sheet, as the readers yield them"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return sum(1 for row in workbook.worksheets[0].iter_rows(values_only=True)
+                   if not _blank(row))
+    finally:
+        workbook.close()
+
+
+class StructureReport:
+    """What the ends of a file say about it: problems reject it, warnings do not"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.header = []
+        self.footer = None
+        self.declared_records = None
+        self.records = None
+        self.problems = []
+        self.warnings = []
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def raise_for_problems(self):
+        if self.problems:
+            raise FileStructureError(f"{os.path.basename(self.file_path)}: "
+                                     + "; ".join(self.problems))
+
+
+def check_structure(file_path, rules=None, footer=True):
+    """Check the header row and, with *footer*, the footer and any record count
+
+    Reads only the first and last rows (and, for a file with a record-count
+    trailer, counts its non-blank rows). Returns a StructureReport.
+    """
+    report = StructureReport(file_path)
+    if os.path.getsize(file_path) == 0:
+        report.problems.append("File is empty")
+        return report
+    report.header = read_header(file_path)
+    if rules is not None and not any(name in rules for name in report.header):
+        report.problems.append("Header row names none of the rule columns")
+    if not footer:
+        return report
+
+    suffix = Path(file_path).suffix.lower()
+    if suffix in DELIMITED_SUFFIXES:
+        line = last_line(file_path)
+        fields = footer_fields(line.split(sniff_delimiter(file_path))) if line else []
+    elif suffix in EXCEL_SUFFIXES:
+        fields = footer_fields(_last_excel_row(file_path))
+    else:
+        # Legacy .xls workbooks cannot be read from the end
+        return report
+    if not fields or fields[0] != FOOTER:
+        report.warnings.append(MISSING_FOOTER)
+        return report
+    report.footer = fields
+    if len(fields) > 1:
+        if not fields[1].isdigit():
+            report.problems.append(f"Footer record count {fields[1]!r} is not a number")
+            return report
+        report.declared_records = int(fields[1])
+        # Less the header and the footer
+        if suffix in DELIMITED_SUFFIXES:
+            report.records = scan_records(file_path)[0] - 2
+        else:
+            report.records = count_excel_rows(file_path) - 2
+        if report.records != report.declared_records:
+            report.problems.append(f"Footer declares {report.declared_records} records "
+                                   f"but the file has {report.records}")
+    return report
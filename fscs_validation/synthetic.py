@@ -0,0 +1,190 @@
+# Synthetic SCV/EX files for benchmarking.
+#
+# generate_frame() builds a file with one column per rule of the "Data
+# inputs" sheet: values of the rule's "Type of data" within its maximum
+# length, domain values for the columns that have one (product types,
+# currencies, flags), and, at configurable rates, deliberately broken values
+# and repeated account numbers, SCV records and addresses. Values are drawn
+# from small pools with numpy, so even millions of rows take seconds.
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .columnar import EXCLUSION_TYPES
+from .hierarchy import PRODUCT_HIERARCHY
+from .writers import EXCEL_MAX_ROWS
+
+VALID_VALUES = {
+    'AlphaNumeric': ["Oak House", "Flat 2", "Acme Ltd", "A1B2C3", "St. John's (North)"],
+    'Alpha': ["Smith", "Jones", "Taylor", "O'Brien", "Lee-Brown"],
+    'Email': ["jane.smith@example.com", "j.jones@example.co.uk", "info@acme.org"],
+    'Phone': ["+447700900123", "07700900456", "00441632960001"],
+    'IBAN': ["GB82WEST12345698765432", "GB33BUKB20201555555555"],
+    'BIC': ["NWBKGB2L", "BUKBGB22", "DEUTDEFF500"],
+    'ASCII': ["Plain text", "Ref 12/34", "See notes"],
+}
+INVALID_VALUES = {
+    'AlphaNumeric': ["Bad#Value", "50% off", "a@b"],
+    'Alpha': ["Sm1th", "J0nes", "Ta_ylor"],
+    'Numeric': ["12A4", "1.5", "N/A"],
+    'Decimal': ["12,50", "abc", "1..2"],
+    'Email': ["not-an-email", "@example.com", "jane@"],
+    'Phone': ["call me", "++44", "0770-090"],
+    'IBAN': ["XX00", "GB82WEST"],
+    'BIC': ["bad", "1234GB2L"],
+    'ASCII': ["naïve", "café"],
+}
+# Columns whose valid values come from a fixed domain
+COLUMN_VALUES = {
+    "title": ["Mr", "Mrs", "Ms", "Dr"],
+    "product_type": list(PRODUCT_HIERARCHY),
+    "exclusion_type": sorted(EXCLUSION_TYPES),
+    "country": ["GBR", "GBR", "GBR", "GIB"],
+    "currency_of_account": ["GBP"] * 9 + ["EUR"],
+    "account_branch_jurisdiction": ["GBR", "GIB"],
+    "brrd_flag": ["YES", "NO"],
+    "structured_deposit_accounts": ["YES", "NO"],
+    "bank_recovery_and_resolution_marking": ["YES", "NO"],
+    "other_national_identifier": ["NID", "DL", "PP"],
+    "postcode": ["SW1A 1AA", "M1 1AE", "B33 8TH", "CR2 6XH", "DN55 1PT"],
+    "address_line_1": ["1 High Street", "22 Station Road", "Flat 3 Oak House"],
+    "date_of_birth": ["01011980", "15061975", "31121999"],
+    "account_holder_indicator": ["1", "2"],
+}
+COLUMN_INVALID_VALUES = {
+    "product_type": ["XYZ"],
+    "exclusion_type": ["NONE"],
+    "country": ["XXX"],
+    "account_branch_jurisdiction": ["USA"],
+    "brrd_flag": ["maybe"],
+    "structured_deposit_accounts": ["maybe"],
+    "other_national_identifier": ["XX"],
+    # batch2 stops at a deposit that is not a number, as batch2.py always has
+    "transferable_eligible_deposit": [],
+}
+EUR_RATE = Decimal("0.85")
+POOL_SIZE = 1000
+
+
+def file_name(index, exclusion=False, suffix=".csv"):
+    """SCV_0001.csv, or EX_0001.csv for an exclusions view file"""
+    return f"{'EX' if exclusion else 'SCV'}_{index:04d}{suffix}"
+
+
+def _digits(rng, length, size):
+    return ["".join(map(str, row)) for row in rng.integers(0, 10, (size, length))]
+
+
+def _valid_pool(rule, rng):
+    if rule.name in COLUMN_VALUES:
+        return COLUMN_VALUES[rule.name]
+    if rule.data_type == 'Numeric':
+        return _digits(rng, min(rule.max_length or 8, 8), POOL_SIZE)
+    if rule.data_type == 'Decimal':
+        return [f"{pence / 100:.2f}" for pence in rng.integers(0, 10_000_000, POOL_SIZE)]
+    pool = VALID_VALUES.get(rule.data_type, VALID_VALUES['AlphaNumeric'])
+    if rule.max_length:
+        pool = [value[:rule.max_length].strip() or "A" for value in pool]
+    return pool
+
+
+def _invalid_pool(rule):
+    pool = list(COLUMN_INVALID_VALUES.get(rule.name, INVALID_VALUES.get(rule.data_type, [])))
+    if rule.max_length:
+        pool.append("9" * (rule.max_length + 5))
+    if rule.mandatory:
+        pool.append(None)
+    return pool
+
+
+def _ids(prefix, count, width):
+    return (prefix + pd.Series(np.arange(count)).astype(str).str.zfill(width)).to_numpy(object)
+
+
+def generate_frame(rules, rows, exclusion=False, error_rate=0.01, duplicate_rate=0.001,
+                   missing_rate=0.1, seed=0):
+    """A synthetic file of *rows* records for every column of *rules*
+
+    *error_rate* is the share of cells given a broken value, *duplicate_rate*
+    the share of rows repeating an earlier account number, SCV record and
+    address, and *missing_rate* the share of optional cells left empty.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for rule in rules:
+        pool = np.array(_valid_pool(rule, rng), dtype=object)
+        values = pool[rng.integers(0, len(pool), rows)]
+        if not rule.mandatory:
+            values[rng.random(rows) < missing_rate] = None
+        data[rule.name] = values
+
+    if "account_number" in data:
+        data["account_number"] = _ids("", rows, 8)
+    if "single_customer_view_record" in data:
+        # About three accounts per customer
+        data["single_customer_view_record"] = _ids("C", max(rows // 3, 1), 7)[
+            np.sort(rng.integers(0, max(rows // 3, 1), rows))]
+    if "product_type" in data and exclusion:
+        data["product_type"] = np.full(rows, "Other", dtype=object)
+    if "exclusion_type" in data and not exclusion:
+        data["exclusion_type"] = np.full(rows, None, dtype=object)
+    _balances(data, rng, rows)
+
+    # Repeat the keys of an earlier row
+    repeats = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    repeats = repeats[repeats > 0]
+    sources = (rng.random(len(repeats)) * repeats).astype(int)
+    for name in ("account_number", "single_customer_view_record", "address_line_1", "postcode"):
+        if name in data:
+            data[name][repeats] = data[name][sources]
+
+    # Break a share of the cells
+    for rule in rules:
+        invalid = _invalid_pool(rule)
+        if not invalid:
+            continue
+        broken = np.flatnonzero(rng.random(rows) < error_rate)
+        data[rule.name][broken] = np.array(invalid, dtype=object)[
+            rng.integers(0, len(invalid), len(broken))]
+    return pd.DataFrame(data)
+
+
+def _balances(data, rng, rows):
+    # Sterling balances consistent with the currency and exchange rate
+    if "account_balance_in_sterling" not in data:
+        return
+    pence = rng.integers(0, 12_000_000, rows)
+    sterling = np.array([f"{p / 100:.2f}" for p in pence], dtype=object)
+    currency = data.get("currency_of_account")
+    if currency is not None:
+        euro = np.flatnonzero(currency == "EUR")
+        original = pence[euro]
+        if "account_balance_in_original_currency" in data:
+            data["account_balance_in_original_currency"][euro] = [
+                f"{p / 100:.2f}" for p in original]
+        if "exchange_rate" in data:
+            data["exchange_rate"][euro] = str(EUR_RATE)
+        sterling[euro] = [str((Decimal(int(p)) / 100 * EUR_RATE)
+                              .quantize(Decimal("0.01"), ROUND_HALF_UP)) for p in original]
+    data["account_balance_in_sterling"] = sterling
+    if "compensatable_amount" in data:
+        data["compensatable_amount"] = sterling.copy()
+
+
+def write_file(frame, path):
+    """Write a synthetic file as .xlsx, .csv, or pipe-delimited .psv/.txt/.dat"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".xlsx":
+        if len(frame) >= EXCEL_MAX_ROWS:
+            raise ValueError(f"{len(frame)} rows do not fit in one Excel sheet")
+        frame.to_excel(path, index=False)
+    elif suffix == ".csv":
+        frame.to_csv(path, index=False)
+    elif suffix in (".psv", ".txt", ".dat"):
+        frame.to_csv(path, index=False, sep="|")
+    else:
+        raise ValueError(f"Cannot write synthetic files as {suffix}")
+    return path
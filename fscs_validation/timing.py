@@ -0,0 +1,147 @@
+# Opt-in timings of validation phases, columns and rules.
+#
+# While a Timings is active (Timings.activate()) the pipeline records wall
+# time per phase (read, validate, build, write), and the engine records per
+# column and per rule the time taken, how often the rule ran and how many
+# cells it failed. A rule's time is the time since the previous rule of its
+# column finished, which is what computing its failure mask cost. Phases
+# nest, and each is charged only the time not spent in the phases inside it.
+# Nothing is recorded, and next to nothing spent, when no Timings is active;
+# only the process that activated it records.
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+TIMINGS_SUFFIX = ".timings.json"
+
+_active = None
+_DONE = object()
+
+
+def active():
+    """The Timings currently recording, or None"""
+    return _active
+
+
+def timings_path(output_path):
+    """Timings written beside a result file: x-result.xlsx -> x-result.timings.json"""
+    return Path(output_path).with_suffix(TIMINGS_SUFFIX)
+
+
+def phase(name):
+    """Context manager charging its time to phase *name* of the active Timings"""
+    return _active.phase(name) if _active is not None else nullcontext()
+
+
+def timed(name, iterable):
+    """Iterate *iterable*, charging the time spent producing each item to *name*"""
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+class Timings:
+    """Wall times and counters for one validation run"""
+
+    def __init__(self):
+        self.phases = {}
+        self.columns = {}
+        self.rules = {}
+        self._stack = []
+
+    @contextmanager
+    def activate(self):
+        global _active
+        previous, _active = _active, self
+        try:
+            yield self
+        finally:
+            _active = previous
+
+    @contextmanager
+    def phase(self, name):
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def column(self, column, seconds, failures):
+        totals = self.columns.setdefault(column, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += failures
+
+    def rule(self, column, rule, seconds, failures):
+        totals = self.rules.setdefault((column, rule), [0.0, 0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+        totals[2] += failures
+
+    def to_dict(self):
+        """Phases, then columns and rules slowest first"""
+        return {
+            "phases": self.phases,
+            "columns": [{"column": column, "seconds": seconds, "failures": failures}
+                        for column, (seconds, failures)
+                        in sorted(self.columns.items(), key=lambda item: -item[1][0])],
+            "rules": [{"column": column, "rule": rule, "seconds": seconds, "calls": calls,
+                       "failures": failures}
+                      for (column, rule), (seconds, calls, failures)
+                      in sorted(self.rules.items(), key=lambda item: -item[1][0])],
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def print_timings(paths, top=15):
+    """Print the phase totals, slowest columns and slowest rules over the
+    timings JSON files at *paths*
+
+    A rule is counted per column, so the same check on two columns is two
+    rows.
+    """
+    phases = {}
+    columns = {}
+    rules = {}
+    for path in paths:
+        try:
+            with open(path) as f:
+                timings = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, seconds in timings["phases"].items():
+            phases[name] = phases.get(name, 0.0) + seconds
+        for record in timings["columns"]:
+            totals = columns.setdefault(record["column"], [0.0, 0])
+            totals[0] += record["seconds"]
+            totals[1] += record["failures"]
+        for record in timings["rules"]:
+            totals = rules.setdefault((record["column"], record["rule"]), [0.0, 0, 0])
+            totals[0] += record["seconds"]
+            totals[1] += record["calls"]
+            totals[2] += record["failures"]
+    if not phases:
+        return
+    print(f"\n{'Phase':<50} {'seconds':>7}")
+    for name, seconds in sorted(phases.items(), key=lambda item: -item[1]):
+        print(f"{name:<50} {seconds:7.2f}")
+    print(f"\n{'Column':<50} {'seconds':>8} {'failures':>10}")
+    for column, (seconds, failures) in sorted(columns.items(),
+                                              key=lambda item: -item[1][0])[:top]:
+        print(f"{column[:50]:<50} {seconds:8.2f} {failures:10d}")
+    print(f"\n{'Column':<35} {'Rule':<45} {'seconds':>8} {'calls':>8} {'failures':>10}")
+    for (column, rule), (seconds, calls, failures) in sorted(rules.items(),
+                                                             key=lambda item: -item[1][0])[:top]:
+        print(f"{column[:35]:<35} {rule[:45]:<45} {seconds:8.2f} {calls:8d} {failures:10d}")
@@ -0,0 +1,221 @@
+# Watch-folder service: validate SCV/EX files as soon as they land.
+#
+# The input folder is watched with inotify where the platform has it (Linux,
+# through libc; no extra package needed) and polled otherwise. Events only
+# wake the watcher up; a file is picked up once its size and mtime have been
+# unchanged for a settle period, so files still being copied in are left
+# alone. Ready files are queued on a bounded process pool (the workers of
+# runner.py) and their results written to results/. A manifest of every file
+# validated successfully is kept beside the results, keyed by the file's
+# content hash, the profile and the hash of the rules workbook. A restarted
+# watcher never redoes completed work, while a file replaced with new
+# content, or validated with another profile or changed rules, is validated
+# again.
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial
+
+from .pipeline import (
+    RESULT_SUFFIX, is_output_file, load_rules, validate_file_incremental,
+    validate_file_streaming,
+)
+from .profiles import get_profile
+from .readers import INPUT_SUFFIXES
+from .rules import RULES_FILE, file_digest
+from .runner import print_status, run_job, worker_count, worker_pool
+
+MANIFEST_FILE = ".fscs-manifest.json"
+# Seconds a file must stay unchanged before it is validated
+SETTLE_SECONDS = 2.0
+# Seconds between scans when polling, and the longest inotify wait
+POLL_SECONDS = 5.0
+
+# inotify(7) flags for a file created, written or moved in
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify watch on one folder, through libc"""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout):
+        """Block until something changes in the folder or *timeout* seconds pass"""
+        if select.select([self.fd], [], [], timeout)[0]:
+            # Drain the events; the watcher rescans the folder either way
+            try:
+                while os.read(self.fd, 64 * _EVENT.size):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    """Stand-in for Inotify where it is unavailable"""
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+def open_events(path):
+    try:
+        return Inotify(path)
+    except (OSError, AttributeError):
+        return Poller()
+
+
+class Manifest:
+    """The files already validated, saved as JSON
+
+    Entries are keyed by (file digest, profile name, rules digest).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def __contains__(self, key):
+        return ":".join(key) in self.entries
+
+    def add(self, key, status):
+        self.entries[":".join(key)] = {"file": os.path.basename(status["file"]),
+                                       "output": status["output"], "rows": status["rows"],
+                                       "finished": time.time()}
+        partial_path = f"{self.path}.partial"
+        with open(partial_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(partial_path, self.path)
+
+
+class FolderWatcher:
+    """Validates every new or changed SCV/EX file in input_dir, until stopped"""
+
+    def __init__(self, input_dir, output_dir=None, profile="batch", rules_path=RULES_FILE,
+                 workers=None, incremental=False, settle=SETTLE_SECONDS, interval=POLL_SECONDS):
+        self.input_dir = input_dir
+        self.output_dir = output_dir if output_dir is not None \
+            else os.path.join(input_dir, "results")
+        self.profile = get_profile(profile)
+        self.rules_path = rules_path
+        # Set by run(), once the workers' rules are compiled
+        self.rules_digest = None
+        self.workers = workers or worker_count()
+        self.incremental = incremental
+        self.settle = settle
+        self.interval = interval
+        self.manifest = Manifest(os.path.join(self.output_dir, MANIFEST_FILE))
+        # path -> (size, mtime_ns, when it was first seen with them)
+        self._pending = {}
+        # (size, mtime_ns) of files already queued or done, so they are not re-hashed
+        self._seen = {}
+        self._ready = deque()
+
+    def _candidates(self):
+        for name in os.listdir(self.input_dir):
+            path = os.path.join(self.input_dir, name)
+            if (name.lower().endswith(INPUT_SUFFIXES) and not is_output_file(name)
+                    and not name.startswith(".") and os.path.isfile(path)):
+                yield path
+
+    def scan(self, now=None):
+        """Queue the files that have settled since the last scan"""
+        now = time.monotonic() if now is None else now
+        for path in self._candidates():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # removed while scanning
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._seen.get(path) == signature:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[:2] != signature:
+                self._pending[path] = signature + (now,)
+            elif now - pending[2] >= self.settle and stat.st_size > 0:
+                del self._pending[path]
+                self._seen[path] = signature
+                key = (file_digest(path), self.profile.name, self.rules_digest)
+                if key not in self.manifest:
+                    self._ready.append((path, key))
+
+    def _output_path(self, path):
+        name = os.path.basename(path).rsplit('.', 1)[0]
+        return os.path.join(self.output_dir, name + RESULT_SUFFIX)
+
+    def run(self, stop_after=None):
+        """Watch until interrupted (or for *stop_after* seconds)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        job = partial(validate_file_incremental if self.incremental else validate_file_streaming,
+                      profile=self.profile.name)
+        # Compile the rules once here, so every worker finds the cache current
+        load_rules(self.rules_path)
+        self.rules_digest = file_digest(self.rules_path)
+        events = open_events(self.input_dir)
+        print(f"Watching {self.input_dir} ({type(events).__name__.lower()}), "
+              f"results in {self.output_dir}")
+        started = time.monotonic()
+        running = {}
+        try:
+            with worker_pool(job, self.rules_path, self.workers) as pool:
+                while stop_after is None or time.monotonic() - started < stop_after:
+                    self.scan()
+                    # At most one queued file per worker; the rest wait here
+                    while self._ready and len(running) < self.workers:
+                        path, key = self._ready.popleft()
+                        running[pool.submit(run_job, path, self._output_path(path))] = key
+                    if running:
+                        done, _ = wait(running, timeout=min(self.settle, self.interval),
+                                       return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._finished(running.pop(future), future.result())
+                    else:
+                        events.wait(self.settle if self._pending else self.interval)
+        except KeyboardInterrupt:
+            print("Stopped; files still in progress will be validated on the next start")
+        finally:
+            events.close()
+
+    def _finished(self, key, status):
+        print_status(status)
+        if status["status"] == "success":
+            self.manifest.add(key, status)
+        else:
+            print(status["error"])
+
+
+def watch_directory(input_dir, output_dir=None, profile="batch", rules_path=RULES_FILE,
+                    workers=None, incremental=False, settle=SETTLE_SECONDS,
+                    interval=POLL_SECONDS):
+    """Validate files in input_dir as they arrive, until interrupted"""
+    FolderWatcher(input_dir, output_dir, profile, rules_path, workers, incremental, settle,
+                  interval).run()
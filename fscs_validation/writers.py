@@ -0,0 +1,312 @@
+# Output layouts and sinks for validated files.
+#
+# A layout turns a chunk of input data and its validation results (the
+# ErrorMasks of columnar.py) into the frame that gets written, rendering the
+# error codes as messages: the original interleaved data/validation rows,
+# side-by-side "<col>__result" columns, or a long table with one row per
+# error. A sink accepts those frames a chunk at a time and writes them out
+# straight away, so the full result never has to be assembled in memory; the
+# output only takes its final name once it is complete.
+import importlib.util
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .error_codes import ERROR_MESSAGES, code_bit, error_message, popcount, word_codes
+from .timing import phase
+
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+RESULT_SUFFIX = "__result"
+FAIL_PREFIX = "Fail - "
+
+
+def _column_results(results, name):
+    """The "Pass" / "Fail - ..." string of every cell of one validated column"""
+    strings = np.full(len(results), "Pass", dtype=object)
+    rows, cells = results.error_codes(name)
+    rendered = {}
+    for row, codes in zip(rows, cells):
+        key = tuple(codes)
+        if key not in rendered:
+            rendered[key] = FAIL_PREFIX + ", ".join(error_message(code) for code in codes)
+        strings[row] = rendered[key]
+    return strings
+
+
+def result_strings(results):
+    """The validation row of every data row, rendered from its ErrorMasks
+
+    Validated cells read "Pass" or "Fail - " and their messages, in check
+    order; columns without a rule are blank.
+    """
+    return pd.DataFrame({
+        name: _column_results(results, name) if results.validated(name)
+        else np.full(len(results), "", dtype=object)
+        for name in results.columns
+    }, index=results.index, columns=results.columns, dtype=object)
+
+
+def format_output(frame, results):
+    """Interleave each data row with its validation row, as the row loops did"""
+    data = frame.copy()
+    data["Individual_Status"] = np.where(frame["title"].notna(), "Individual", "") \
+        if "title" in frame.columns else ""
+    out = np.empty((2 * len(data), len(data.columns)), dtype=object)
+    out[0::2] = data.to_numpy(dtype=object)
+    out[1::2] = result_strings(results).reindex(columns=data.columns).to_numpy(dtype=object)
+    return pd.DataFrame(out, columns=data.columns)
+
+
+def side_by_side(frame, results):
+    """Each validated column followed by its own <col>__result column"""
+    columns = {}
+    for name in frame.columns:
+        columns[name] = frame[name]
+        if results.validated(name):
+            columns[name + RESULT_SUFFIX] = _column_results(results, name)
+    out = pd.DataFrame(columns, index=frame.index)
+    out["Individual_Status"] = np.where(frame["title"].notna(), "Individual", "") \
+        if "title" in frame.columns else ""
+    return out.reset_index(drop=True)
+
+
+def error_table(frame, results):
+    """One (row, column, code, error) record per failure; passing cells are dropped
+
+    Built from the masks alone: an OR over a column gives the codes any of
+    its cells failed with, and the rows of each code are those with its bit
+    set. Records are ordered by row, then column, then check order.
+    """
+    total = sum(int(popcount(masks).sum()) for masks in results.masks.values()) \
+        + sum(int(popcount(masks).sum()) for masks in results.repeated.values())
+    rows = np.empty(total, dtype=np.int64)
+    columns = np.empty(total, dtype=np.int64)
+    codes = np.empty(total, dtype=np.int64)
+    ranks = np.empty(total, dtype=np.int64)
+    filled = 0
+    for position, name in enumerate(results.columns):
+        if not results.validated(name):
+            continue
+        rank = {code: i for i, code in enumerate(results.order.get(name, ()))}
+        for layer in (results.masks[name], results.repeated.get(name)):
+            if layer is None:
+                continue
+            for word in range(layer.shape[1]):
+                values = layer[:, word]
+                for code in word_codes(word, np.bitwise_or.reduce(values)):
+                    hit = np.flatnonzero(values & code_bit(code)[1])
+                    end = filled + len(hit)
+                    rows[filled:end] = hit
+                    columns[filled:end] = position
+                    codes[filled:end] = code
+                    ranks[filled:end] = rank.get(code, len(rank) + code)
+                    filled = end
+    order = np.lexsort((ranks, columns, rows))
+    rows, columns, codes = rows[order], columns[order], codes[order]
+    names = np.array(results.columns, dtype=object)
+    messages = np.array(ERROR_MESSAGES, dtype=object)
+    return pd.DataFrame({
+        "row": results.index[rows],
+        "column": names[columns],
+        "code": codes,
+        "error": messages[codes],
+    })
+
+
+LAYOUTS = {
+    "interleaved": format_output,
+    "side_by_side": side_by_side,
+    "errors": error_table,
+}
+
+
+def _rows(frame):
+    """Frame rows as lists, with missing cells as None (blank in the output)"""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+class Sink:
+    """Base of the sinks: frames are written to <path>.partial
+
+    close() finishes the output and renames it to *path*. Every sink behaves
+    the same when an error escapes its with block: the partial file is
+    closed, so no file handle or temporary file is left open, and deleted.
+    A failed run therefore never leaves a half-written file that looks like
+    a result, and never replaces the result of an earlier run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.partial_path = Path(f"{path}.partial")
+
+    def write(self, frame):
+        raise NotImplementedError
+
+    def _finish(self):
+        """Flush and close the partial file"""
+
+    def close(self):
+        self._finish()
+        if self.partial_path.exists():
+            os.replace(self.partial_path, self.path)
+
+    def discard(self):
+        """Close and delete the partial file, leaving *path* as it was"""
+        try:
+            self._finish()
+        except Exception:
+            pass  # the error that got us here is the one worth reporting
+        self.partial_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ExcelSink(Sink):
+    """Appends frames to a write-only workbook"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        super().__init__(path)
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._header_written = False
+
+    def write(self, frame):
+        if not self._header_written:
+            self._sheet.append(list(frame.columns))
+            self._header_written = True
+        for row in _rows(frame):
+            self._sheet.append(row)
+
+    def _finish(self):
+        self._workbook.save(self.partial_path)
+
+
+class XlsxSink(Sink):
+    """Streams frames into an xlsxwriter workbook in constant_memory mode
+
+    Each row is flushed to disk as soon as the next one starts, which is
+    several times faster than openpyxl. Output that outgrows one worksheet
+    carries on in a new one under the same header.
+    """
+
+    def __init__(self, path):
+        import xlsxwriter
+
+        super().__init__(path)
+        self._workbook = xlsxwriter.Workbook(str(self.partial_path), {"constant_memory": True})
+        self._sheet = None
+        self._header = None
+        self._row = 0
+
+    def _new_sheet(self):
+        self._sheet = self._workbook.add_worksheet()
+        self._sheet.write_row(0, 0, self._header)
+        self._row = 1
+
+    def write(self, frame):
+        if self._sheet is None:
+            self._header = [str(name) for name in frame.columns]
+            self._new_sheet()
+        for row in _rows(frame):
+            if self._row == EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self._sheet.write_row(self._row, 0, row)
+            self._row += 1
+
+    def _finish(self):
+        self._workbook.close()
+
+
+class CsvSink(Sink):
+    """Appends frames to a CSV file"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._header_written = False
+
+    def write(self, frame):
+        frame.to_csv(self.partial_path, mode='a' if self._header_written else 'w',
+                     header=not self._header_written, index=False)
+        self._header_written = True
+
+
+class ParquetSink(Sink):
+    """Appends frames as row groups of one Parquet file (needs pyarrow)"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._writer = None
+        self._schema = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Cells are text or blank; keep every column a string column so that
+        # each chunk matches the schema of the first
+        frame = frame.astype(object)
+        frame = frame.where(frame.isna(), frame.astype(str))
+        if self._writer is None:
+            self._schema = pa.schema([(str(name), pa.string()) for name in frame.columns])
+            self._writer = pq.ParquetWriter(self.partial_path, self._schema)
+        frame.columns = [str(name) for name in frame.columns]
+        self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema,
+                                                      preserve_index=False))
+
+    def _finish(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_sink(path):
+    """Pick a sink from the output file's extension"""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        return CsvSink(path)
+    if suffix == '.parquet':
+        return ParquetSink(path)
+    # Fall back to openpyxl's write-only mode without xlsxwriter
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        return XlsxSink(path)
+    return ExcelSink(path)
+
+
+class ResultWriter:
+    """Lays out (frame, results) pairs and writes them to a sink"""
+
+    def __init__(self, sink, layout="interleaved"):
+        self.sink = sink
+        self.layout = LAYOUTS[layout]
+
+    def write(self, frame, results):
+        with phase("build"):
+            out = self.layout(frame, results)
+        with phase("write"):
+            self.sink.write(out)
+
+    def __enter__(self):
+        self.sink.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.sink.__exit__(exc_type, exc, tb)
+
+
+def open_writer(path, layout="interleaved"):
+    """Result writer for *path* in one of LAYOUTS"""
+    return ResultWriter(open_sink(path), layout)
@@ -0,0 +1,120 @@
+# Tests of the column-at-a-time engine's building blocks.
+import time
+
+import numpy as np
+import pandas as pd
+
+from fscs_validation import VALIDATORS, RuleSet, register_validator, validate_columns
+from fscs_validation.columnar import ValidationState
+from fscs_validation.error_codes import code_bit, error_code, mask_words
+from fscs_validation.writers import error_table, result_strings
+
+
+def _chunk(start, size):
+    return pd.Series([f"ACC{i:09d}" for i in range(start, start + size)], dtype=object)
+
+
+def test_duplicates_across_calls():
+    state = ValidationState()
+    first = state.duplicated("account_number", pd.Series(["A", "B", "A"], dtype=object))
+    second = state.duplicated("account_number", pd.Series(["C", "B", "C"], dtype=object))
+    assert first.tolist() == [False, False, True]
+    assert second.tolist() == [False, True, True]
+
+
+def test_duplicate_check_cost_stays_flat():
+    # Each chunk adds 20,000 keys; a check that rebuilt its lookup table from
+    # every key seen so far would take ~40 times longer on the last chunk
+    size, chunks = 20_000, 40
+    state = ValidationState()
+    timings = []
+    for i in range(chunks):
+        keys = _chunk(i * size, size)
+        started = time.perf_counter()
+        state.duplicated("account_number", keys)
+        timings.append(time.perf_counter() - started)
+    first, last = np.median(timings[1:6]), np.median(timings[-5:])
+    assert last < 4 * first
+
+
+def _rules(*rows):
+    return RuleSet.from_frame(pd.DataFrame(
+        rows, columns=["Name in File", "Type of data", "Max Number of Characters",
+                       "Mandate or not", "Pattern"]))
+
+
+def test_masks_hold_registry_codes():
+    rules = _rules(("account_number", "AlphaNumeric", 4, "Yes", None))
+    frame = pd.DataFrame({"account_number": ["A1", "A1", "TOO LONG", None],
+                          "notes": ["x", "y", "z", "w"]})
+    results = validate_columns(frame, rules, "batch")
+    assert not results.validated("notes")
+    masks = results.masks["account_number"]
+    for row, message in ((1, "Duplicate Account Number"), (2, "Exceeds Max Length"),
+                         (3, "Missing Mandatory Value")):
+        word, bit = code_bit(error_code(message))
+        assert masks[row, word] & bit
+    assert not masks[0].any()
+
+    errors = error_table(frame, results)
+    assert errors[["row", "column", "error"]].values.tolist() == [
+        [1, "account_number", "Duplicate Account Number"],
+        [2, "account_number", "Exceeds Max Length"],
+        [3, "account_number", "Missing Mandatory Value"],
+    ]
+    assert errors["code"].tolist() == [error_code(message) for message in errors["error"]]
+
+
+def test_codes_past_the_first_mask_word():
+    # Declared types register codes after the built-in ones, past bit 63
+    rules = _rules(*[(f"field_{i}", f"Declared{i}", None, "No", "[0-9]+") for i in range(3)])
+    assert mask_words() > 1
+    frame = pd.DataFrame({f"field_{i}": ["12", "x"] for i in range(3)})
+    results = validate_columns(frame, rules, "batch")
+    strings = result_strings(results)
+    assert strings.iloc[0].tolist() == ["Pass"] * 3
+    assert strings.iloc[1].tolist() == [f"Fail - Invalid Declared{i} Format" for i in range(3)]
+    assert error_table(frame, results)["error"].tolist() == \
+        [f"Invalid Declared{i} Format" for i in range(3)]
+
+
+def test_declared_types_stay_with_their_rules():
+    alphanumeric = VALIDATORS["AlphaNumeric"]
+    rules = _rules(("reference", "AlphaNumeric", None, "No", "[A-Z ]+"),
+                   ("branch_code", "BranchCode", None, "No", "[0-9]{4}"))
+    assert VALIDATORS["AlphaNumeric"] is alphanumeric and "BranchCode" not in VALIDATORS
+
+    # A Pattern for a type the code knows is checked as well as the code's
+    # own check, and a cell failing both is reported once
+    frame = pd.DataFrame({"reference": ["JOINT", "Joint", "A#"],
+                          "branch_code": ["1234", "12A4", "0001"]})
+    failed = "Fail - Invalid AlphaNumeric Format"
+    for profile in ("script", "script2", "batch", "batch2", "batch3"):
+        strings = result_strings(validate_columns(frame, rules, profile))
+        assert strings["reference"].tolist() == ["Pass", failed, failed]
+        assert strings["branch_code"].tolist() == \
+            ["Pass", "Fail - Invalid BranchCode Format", "Pass"]
+
+
+def test_declared_pattern_kept_beside_a_registered_validator():
+    register_validator("BranchCode", "[0-9A-Z]{4}")
+    try:
+        rules = _rules(("branch_code", "BranchCode", None, "No", "[0-9]{4}"))
+        frame = pd.DataFrame({"branch_code": ["1234", "12A4"]})
+        strings = result_strings(validate_columns(frame, rules, "batch"))
+        assert strings["branch_code"].tolist() == ["Pass", "Fail - Invalid BranchCode Format"]
+    finally:
+        del VALIDATORS["BranchCode"]
+
+
+def test_checks_look_their_validators_up():
+    phone = VALIDATORS["Phone"]
+    rules = _rules(("mobile_phone_number", "Phone", None, "No", None))
+    frame = pd.DataFrame({"mobile_phone_number": ["+447700900123", "07700900123"]})
+    register_validator("Phone", r"0[0-9]{10}")
+    try:
+        strings = result_strings(validate_columns(frame, rules, "batch2"))
+    finally:
+        VALIDATORS["Phone"] = phone
+    assert strings["mobile_phone_number"].tolist() == \
+        ["Fail - Invalid Phone Number Format", "Pass"]
@@ -0,0 +1,82 @@
+# Tests of the per-customer compensation limit.
+from pathlib import Path
+
+import pandas as pd
+
+from fscs_validation import RuleSet, validate_columns, validate_file_streaming
+from fscs_validation.__main__ import main
+from fscs_validation.customers import aggregate_customers, over_limit_customers
+from fscs_validation.rules import RULES_SHEET
+from fscs_validation.writers import result_strings
+
+HERE = Path(__file__).parent
+
+THB = "Fail - Potential THB - Customer balances exceed compensation limit"
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("single_customer_view_record", "AlphaNumeric", 20, "No"),
+         ("account_balance_in_sterling", "Decimal", 20, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+def _accounts():
+    # C1 holds 90,000 over two accounts, C2 60,000; the last account has no
+    # customer record and is over the limit on its own
+    return pd.DataFrame({
+        "single_customer_view_record": ["C1", "C2", "C2", " C1", None],
+        "account_balance_in_sterling": ["50000", "30000", "30000", "40000", "85000.01"],
+    })
+
+
+def test_limit_applies_per_customer():
+    summary = aggregate_customers([_accounts()])
+    assert over_limit_customers(summary).tolist() == ["C1"]
+    strings = result_strings(validate_columns(_accounts(), _rules(), "batch2"))
+    assert strings["account_balance_in_sterling"].tolist() == [THB, "Pass", "Pass", THB, THB]
+
+
+def test_summary_and_flags_agree_on_the_limit():
+    # C1's balances are over the limit but little of them is compensatable;
+    # C2 is the other way round
+    accounts = pd.DataFrame({
+        "single_customer_view_record": ["C1", "C1", "C2"],
+        "account_balance_in_sterling": ["50000", "40000", "1000"],
+        "compensatable_amount": ["100", "100", "90000"],
+    })
+    summary = aggregate_customers([accounts])
+    assert summary["over_limit"].tolist() == [True, False]
+    assert over_limit_customers(summary).tolist() == ["C1"]
+    assert summary["excess"].tolist() == [0, 5000]
+    strings = result_strings(validate_columns(accounts, _rules(), "batch2"))
+    assert strings["account_balance_in_sterling"].tolist() == [THB, THB, "Pass"]
+
+
+def test_customers_spread_over_chunks(tmp_path):
+    input_path, output_path = tmp_path / "SCV.csv", tmp_path / "SCV-result.csv"
+    _accounts().to_csv(input_path, index=False)
+    validate_file_streaming(input_path, _rules(), output_path, "batch2", chunksize=2,
+                            layout="side_by_side", customers=True)
+    output = pd.read_csv(output_path, dtype=str, keep_default_na=False)
+    assert output["account_balance_in_sterling__result"].tolist() == \
+        [THB, "Pass", "Pass", THB, THB]
+    summary = pd.read_csv(tmp_path / "SCV-result.customers.csv", index_col=0)
+    assert summary.loc["C1", "account_balance_in_sterling"] == 90000
+
+
+def test_second_run_skips_the_customer_summaries(tmp_path, capsys):
+    rules_path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.read_csv(HERE / "data" / "rules.csv").to_excel(rules_path, sheet_name=RULES_SHEET,
+                                                      index=False)
+    folder = tmp_path / "in"
+    folder.mkdir()
+    _accounts().to_csv(folder / "SCV_0.csv", index=False)
+    argv = [str(folder), "--profile", "batch2", "--customers", "--rules", str(rules_path),
+            "--workers", "1"]
+    for _ in range(2):
+        assert main(argv) == 0
+        assert "Found 1 files to process" in capsys.readouterr().out
+    assert sorted(path.name for path in folder.iterdir()) == \
+        ["SCV_0-result.customers.csv", "SCV_0-result.xlsx", "SCV_0.csv"]
@@ -0,0 +1,51 @@
+# Tests of cross-file duplicate detection.
+from pathlib import Path
+
+import pandas as pd
+
+from fscs_validation import run_directory
+from fscs_validation.duplicate_index import INDEX_FILE, REPORT_FILE, DuplicateIndex
+from fscs_validation.rules import RULES_SHEET
+
+HERE = Path(__file__).parent
+
+
+def test_keys_repeated_across_files(tmp_path, capsys):
+    rules_path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.read_csv(HERE / "data" / "rules.csv").to_excel(rules_path, sheet_name=RULES_SHEET,
+                                                      index=False)
+    folder = tmp_path / "in"
+    folder.mkdir()
+    pd.DataFrame({"account_number": ["A1", "A2", "A2"],
+                  "address_line_1": ["1 High  Street", "2 Low Road", None],
+                  "postcode": ["AB1 2CD", "EF3 4GH", None]}).to_csv(folder / "SCV_0.csv",
+                                                                   index=False)
+    pd.DataFrame({"account_number": [" a1 ", "A3"],
+                  "address_line_1": ["1 high street", "2 Low Road"],
+                  "postcode": ["ab1 2cd", "XY9 9YZ"]}).to_csv(folder / "SCV_EX_1.csv",
+                                                             index=False)
+    run_directory(str(folder), profile="batch", rules_path=str(rules_path), workers=2,
+                  cross_file=True)
+    assert "2 keys duplicated across files" in capsys.readouterr().out
+    report = pd.read_csv(folder / REPORT_FILE, dtype={"row": int})
+    assert report[["kind", "key", "row"]].values.tolist() == [
+        ["account_number", "A1", 0], ["account_number", "A1", 0],
+        ["address", "1 HIGH STREET_AB1 2CD", 0], ["address", "1 HIGH STREET_AB1 2CD", 0]]
+    assert [Path(name).name for name in report["file"]] == ["SCV_0.csv", "SCV_EX_1.csv"] * 2
+    # A2, repeated within one file, is that file's duplicate check's concern
+    assert "A2" not in report["key"].tolist()
+
+
+def test_new_index_replaces_an_old_one(tmp_path):
+    path = str(tmp_path / INDEX_FILE)
+    with DuplicateIndex.create(path) as index:
+        index.add("a.csv", pd.DataFrame({"account_number": ["A1"]}))
+        index.add("b.csv", pd.DataFrame({"account_number": ["A1"]}))
+        assert len(index.duplicates()) == 2
+    with DuplicateIndex.create(path) as index:
+        # No address without its first line; no postcode column is fine
+        index.add("a.csv", pd.DataFrame({"account_number": [None, "A1"],
+                                         "address_line_1": [None, "1 High Street"]}))
+        assert index.duplicates().empty
+        index.add("b.csv", pd.DataFrame({"address_line_1": ["1 HIGH STREET"]}))
+        assert index.duplicates()["key"].tolist() == ["1 HIGH STREET_"] * 2
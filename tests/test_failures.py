@@ -0,0 +1,52 @@
+# Tests of the failures-only result mode.
+import pandas as pd
+
+from fscs_validation import RuleSet, iter_file_errors, validate_file, validate_file_errors
+from fscs_validation.error_codes import error_code
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 6, "Yes"),
+         ("product_type", "AlphaNumeric", 10, "No"),
+         ("notes", "ASCII", None, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+def _write(tmp_path, frame):
+    path = tmp_path / "SCV.csv"
+    frame.to_csv(path, index=False)
+    return path
+
+
+def test_failures_match_the_full_results(tmp_path):
+    path = _write(tmp_path, pd.DataFrame({
+        "account_number": ["A1", "A2", None, "A1", "TOOLONG1", "A3", "A2"],
+        "product_type": ["ISA", "XYZ", "ISA", "NA", "ISA", "XYZ", "ISA"],
+        "notes": ["ok", "ok", "café", None, "ok", "ok", "ok"],
+    }))
+    full = validate_file(path, _rules(), "batch").iloc[1::2].reset_index(drop=True)
+    expected = {(row, column): tuple(error_code(message)
+                                     for message in text[len("Fail - "):].split(", "))
+                for column in ("account_number", "product_type", "notes")
+                for row, text in full[column].items()
+                if text.startswith("Fail")}
+    # Chunks of two, so duplicates are found across chunks
+    report = validate_file_errors(path, _rules(), "batch", chunksize=2)
+    assert {(row, column): codes for row, column, codes in report.records()} == expected
+    assert len(report) == len(expected)
+    assert report.column_counts()["account_number"] == 4
+    counts = report.error_counts()
+    assert counts["Duplicate Account Number"] == 2 and counts["Invalid Product Type"] == 2
+    assert sum(len(chunk_report) for _, chunk_report
+               in iter_file_errors(path, _rules(), "batch", chunksize=2)) == len(report)
+
+
+def test_clean_file_gives_an_empty_report(tmp_path):
+    path = _write(tmp_path, pd.DataFrame({"account_number": ["A1", "A2"],
+                                          "product_type": ["ISA", "NA"]}))
+    report = validate_file_errors(path, _rules(), "batch")
+    assert len(report) == 0 and report.records() == []
+    assert list(report.to_frame().columns) == ["row", "column", "code", "error"]
+    assert report.error_counts().empty and report.column_counts().empty
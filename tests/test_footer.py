@@ -0,0 +1,72 @@
+# Tests of the FSCS footer row and its record count.
+import pandas as pd
+import pytest
+
+from fscs_validation import RuleSet, check_structure, iter_chunks, read_input, validate_file
+from fscs_validation.readers import FOOTER
+
+RECORDS = 50
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("single_customer_view_record", "AlphaNumeric", 20, "No"),
+         ("account_balance_in_sterling", "Decimal", 20, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+def _rows():
+    return [[f"C{i}", f"{i}.00"] for i in range(RECORDS)]
+
+
+def _csv(tmp_path):
+    path = tmp_path / "SCV.csv"
+    lines = ["single_customer_view_record,account_balance_in_sterling"]
+    lines += [",".join(row) for row in _rows()]
+    # A blank line is skipped, not counted
+    lines.insert(10, "")
+    path.write_text("\n".join(lines + [f"{FOOTER},{RECORDS}"]) + "\n")
+    return path
+
+
+def _workbook(tmp_path):
+    from openpyxl import Workbook
+
+    path = tmp_path / "SCV.xlsx"
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["single_customer_view_record", "account_balance_in_sterling"])
+    for i, row in enumerate(_rows()):
+        if i == 10:
+            sheet.append([])
+        sheet.append(row)
+    sheet.append([FOOTER, RECORDS])
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("make", [_csv, _workbook])
+def test_footer_is_not_a_record(tmp_path, make):
+    path = make(tmp_path)
+    report = check_structure(path, _rules())
+    assert report.ok and report.records == RECORDS
+    assert len(read_input(path, _rules(), footer=True)) == RECORDS
+    assert len(read_input(path, _rules())) == RECORDS + 1
+    # 25 leaves the footer alone in the last chunk
+    for chunksize in (7, 25, 1000):
+        chunks = list(iter_chunks(path, _rules(), chunksize, footer=True))
+        assert sum(map(len, chunks)) == RECORDS and all(len(chunk) for chunk in chunks)
+    output = validate_file(path, _rules(), "batch2")
+    assert len(output) == 2 * RECORDS
+    assert FOOTER not in output["single_customer_view_record"].tolist()
+
+
+def test_records_with_line_breaks_count_once(tmp_path):
+    path = tmp_path / "SCV.csv"
+    lines = ["single_customer_view_record,account_balance_in_sterling"]
+    lines += [f'"C{i}\nline two",{i}.00' for i in range(RECORDS)]
+    path.write_text("\n".join(lines + [f"{FOOTER},{RECORDS}"]) + "\n")
+    report = check_structure(path, _rules())
+    assert report.ok and report.records == RECORDS
+    assert len(read_input(path, _rules(), footer=True)) == RECORDS
@@ -0,0 +1,42 @@
+# Tests of the incremental revalidation cache.
+import pandas as pd
+
+from fscs_validation import RuleSet, incremental, validate_columns
+from fscs_validation.incremental import fingerprint, validate_incremental
+from fscs_validation.writers import result_strings
+
+
+def _rules(pattern=None):
+    return RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 10, "Yes", None),
+         ("branch_code", "BranchCode", None, "No", pattern)],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not", "Pattern"]))
+
+
+def test_fingerprint_covers_profile_rules_and_engine(monkeypatch):
+    frame = pd.DataFrame({"account_number": ["A1"], "branch_code": ["1234"]})
+    rules = _rules("[0-9]{4}")
+    key = fingerprint(frame, rules, "batch")
+    assert fingerprint(frame, _rules("[0-9]{4}"), "batch") == key
+    # script and script2 differ only in what their AlphaNumeric check accepts
+    assert fingerprint(frame, rules, "script") != fingerprint(frame, rules, "script2")
+    assert fingerprint(frame, _rules("[0-9]{6}"), "batch") != key
+    monkeypatch.setattr(incremental, "ENGINE_VERSION", incremental.ENGINE_VERSION + 1)
+    assert fingerprint(frame, rules, "batch") != key
+
+
+def test_resubmission_matches_a_full_run(tmp_path):
+    cache_file = tmp_path / "SCV-result.cache.parquet"
+    rules = _rules("[0-9]{4}")
+    frame = pd.DataFrame({"account_number": ["A1", "A2", "A1"],
+                          "branch_code": ["1234", "12A4", None]})
+    validate_incremental(frame, rules, "batch2", cache_file)
+    # Reordered, with one row changed: the cache still serves the other two
+    resubmitted = frame.iloc[::-1].reset_index(drop=True)
+    resubmitted.loc[0, "branch_code"] = "9A"
+    results = validate_incremental(resubmitted, rules, "batch2", cache_file)
+    expected = validate_columns(resubmitted, rules, "batch2")
+    assert result_strings(results).equals(result_strings(expected))
+    assert result_strings(results)["account_number"].tolist() == \
+        ["Pass", "Pass", "Fail - Duplicate Account Number"]
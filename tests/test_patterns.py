@@ -0,0 +1,39 @@
+# Tests of the per-value memo the stateless checks go through.
+import numpy as np
+import pandas as pd
+
+from fscs_validation import RuleSet, get_validator, validate_columns
+from fscs_validation.patterns import match_all, per_value
+from fscs_validation.writers import result_strings
+
+
+def test_each_distinct_value_checked_once():
+    seen = []
+
+    def check(value):
+        seen.append(value)
+        return value.startswith("F")
+
+    values = pd.Series(["ISA", "FD1", "ISA", "FD1", "NA"] * 1000)
+    assert per_value(check, values, dtype=bool).tolist() == [False, True, False, True, False] * 1000
+    assert sorted(seen) == ["FD1", "ISA", "NA"]
+    assert match_all(["ISA", "isa"], "[A-Z]+$").tolist() == [True, False]
+    assert get_validator("ASCII").check_series(pd.Series(["ok", "café", None, "ok"])).tolist() \
+        == [True, False, True, True]
+
+
+def test_empty_values():
+    assert per_value(str.upper, [], dtype=bool).tolist() == []
+    assert match_all(pd.Series([], dtype=object), "x").dtype == np.bool_
+
+
+def test_cross_row_checks_still_see_every_row():
+    # The same value passes the first time and fails as a duplicate after
+    rules = RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 10, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+    frame = pd.DataFrame({"account_number": ["A1", "A1", "A2", "A1"]})
+    strings = result_strings(validate_columns(frame, rules, "batch"))
+    assert strings["account_number"].tolist() == [
+        "Pass", "Fail - Duplicate Account Number", "Pass", "Fail - Duplicate Account Number"]
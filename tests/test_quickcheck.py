@@ -0,0 +1,49 @@
+# Tests of the sampled quick check's error-rate estimates.
+import pandas as pd
+
+from fscs_validation import RuleSet, quick_check_file
+from fscs_validation.readers import FOOTER
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 10, "Yes"),
+         ("title", "Alpha", 10, "No"),
+         ("surname", "Alpha", 20, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+def test_rates_are_shares_of_sampled_rows(tmp_path):
+    # One row in ten has a bad title: 10% of rows, but only 1 cell in 30
+    path = tmp_path / "SCV_0001.csv"
+    pd.DataFrame({"account_number": [f"A{i}" for i in range(2000)],
+                  "title": ["Mr1" if i % 10 == 0 else "Mr" for i in range(2000)],
+                  "surname": ["Smith"] * 2000}).to_csv(path, index=False)
+    report = quick_check_file(path, _rules(), "batch", rows=2000, error_budget=0.05)
+
+    rate, lower, upper = report.row_error_rate()
+    assert rate == report.failing_rows / report.sampled_rows
+    assert lower < rate < upper and abs(rate - 0.1) < 0.03
+    # Over the 5% budget, which a share of cells would never have shown
+    assert report.stopped_early and not report.ok
+    rates = report.column_rates().set_index("column")["rate"]
+    assert rates["title"] == rate and rates["surname"] == rates["account_number"] == 0
+
+
+def _with_footer(tmp_path, count):
+    path = tmp_path / "SCV_0002.csv"
+    lines = ["account_number,title,surname"] + [f"A{i},Mr,Smith" for i in range(100)]
+    path.write_text("\n".join(lines + [f"{FOOTER},{count}"]) + "\n")
+    return path
+
+
+def test_footer_checked_whatever_the_profile(tmp_path):
+    for profile in ("script", "batch", "batch2", "batch3"):
+        report = quick_check_file(_with_footer(tmp_path, 100), _rules(), profile, rows=200)
+        assert report.ok and report.structure.records == 100
+        # The footer is not sampled as a record with a bad account number
+        assert report.sampled_rows and report.failing_rows == 0
+        report = quick_check_file(_with_footer(tmp_path, 99), _rules(), profile, rows=200)
+        assert not report.ok
+        assert report.structure.problems == ["Footer declares 99 records but the file has 100"]
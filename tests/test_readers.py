@@ -0,0 +1,81 @@
+# Tests of reading SCV/EX input files.
+import pandas as pd
+import pytest
+
+from fscs_validation import RuleSet, iter_chunks, read_input
+from fscs_validation import readers
+from fscs_validation.readers import sample_rows, scan_records
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 20, "No"),
+         ("account_balance_in_sterling", "Decimal", 20, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "SCV.xlsx"
+    frame = pd.DataFrame({"account_number": [1234, "A1", None, 56.0],
+                          "account_balance_in_sterling": [90, None, 12.5, "7.25"]})
+    frame.to_excel(path, index=False)
+    return path
+
+
+def _values(values):
+    return [None if pd.isna(value) else value for value in values]
+
+
+def test_excel_amounts_read_as_the_scripts_read_them(workbook):
+    # Whole amounts stored as numbers keep their decimal point, as pandas
+    # gave them to the per-cell scripts; other columns are read as written
+    expected = {"account_number": ["1234", "A1", None, "56"],
+                "account_balance_in_sterling": ["90.0", None, "12.5", "7.25"]}
+    frame = read_input(workbook, _rules())
+    chunks = list(iter_chunks(workbook, _rules(), chunksize=3))
+    for name, values in expected.items():
+        assert _values(frame[name]) == values
+        assert _values(pd.concat([chunk[name].astype(object) for chunk in chunks])) == values
+
+
+def test_delimited_amounts_are_read_as_written(tmp_path):
+    path = tmp_path / "SCV.csv"
+    path.write_text("account_number,account_balance_in_sterling\n0012,90\n")
+    frame = read_input(path, _rules())
+    assert frame.iloc[0].tolist() == ["0012", "90"]
+
+
+def _multiline(tmp_path):
+    # Every third address has a line break, or a quoted quote, inside it
+    path = tmp_path / "SCV.csv"
+    pd.DataFrame({"account_number": [f"A{i}" for i in range(300)],
+                  "address_line_1": ["1 High St\nFlat 2" if i % 3 == 0 else
+                                     'The "Old" Mill' if i % 3 == 1 else "2 Low Rd"
+                                     for i in range(300)]}).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("block", [7, 64, 1 << 20])
+def test_records_counted_across_quoted_line_breaks(tmp_path, monkeypatch, block):
+    monkeypatch.setattr(readers, "SCAN_BLOCK", block)
+    assert scan_records(_multiline(tmp_path)) == (301, True)
+    path = tmp_path / "plain.csv"
+    path.write_text('account_number\r\n\r\n"A1"\r\nA2\r\n  \r\n')
+    assert scan_records(path) == (3, False)
+
+
+def test_sampled_records_are_whole(tmp_path):
+    rules = RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 20, "No"),
+         ("address_line_1", "AlphaNumeric", 50, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+    samples = list(sample_rows(_multiline(tmp_path), rules, rows=60, strata=6))
+    assert sum(size for _, size in samples) == 300
+    sampled = pd.concat([frame for frame, _ in samples])
+    assert len(sampled) == 60 and sampled.index.is_unique
+    numbers = sampled["account_number"].astype(str).str[1:].astype(int)
+    assert (numbers == sampled.index).all()
+    assert (sampled.loc[sampled.index % 3 == 0, "address_line_1"] == "1 High St\nFlat 2").all()
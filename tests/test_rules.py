@@ -0,0 +1,96 @@
+# Tests of the compiled rule table.
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from fscs_validation import ColumnRule, RuleSet, validate_file
+from fscs_validation.rules import RULES_CACHE_VERSION, RULES_SHEET, rules_cache_path
+
+COLUMNS = ["Name in File", "Type of data", "Max Number of Characters", "Mandate or not"]
+
+
+def test_one_rule_per_column():
+    rules = RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 20.0, "Yes"),
+         ("notes", "ASCII", None, "No"),
+         ("account_number", "Numeric", 5, "No")],
+        columns=COLUMNS))
+    assert len(rules) == 2 and "notes" in rules and "postcode" not in rules
+    # The first row wins when a name repeats
+    rule = rules["account_number"]
+    assert isinstance(rule, ColumnRule)
+    assert (rule.max_length, rule.data_type, rule.mandatory) == (20, "AlphaNumeric", True)
+    assert rules["notes"].max_length is None and not rules["notes"].mandatory
+    assert rules.get("postcode") is None
+    assert RuleSet.coerce(rules) is rules
+    assert RuleSet.from_records(rules.to_records()).to_records() == rules.to_records()
+
+
+def test_rule_set_and_frame_validate_alike(tmp_path):
+    rules_df = pd.DataFrame([("account_number", "AlphaNumeric", 4, "Yes"),
+                             ("title", None, None, "No")], columns=COLUMNS)
+    path = tmp_path / "SCV.csv"
+    pd.DataFrame({"account_number": ["A1", "TOOLONG", None], "title": ["Mr", "Dr", None],
+                  "extra": ["x", "y", "z"]}).to_csv(path, index=False)
+    compiled = validate_file(path, RuleSet.from_frame(rules_df), "batch")
+    pd.testing.assert_frame_equal(compiled, validate_file(path, rules_df, "batch"))
+    results = compiled.iloc[1::2]
+    assert results["account_number"].tolist() == [
+        "Pass", "Fail - Exceeds Max Length", "Fail - Missing Mandatory Value"]
+    # A rule without a type is still checked; a column without a rule is not
+    assert results["title"].tolist() == ["Pass", "Pass", "Pass"]
+    assert results["extra"].tolist() == ["", "", ""]
+
+
+def _workbook(tmp_path, max_length=20):
+    path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.DataFrame([("account_number", "AlphaNumeric", max_length, "Yes")],
+                 columns=COLUMNS).to_excel(path, sheet_name=RULES_SHEET, index=False)
+    return path
+
+
+def _no_workbook(*args, **kwargs):
+    raise AssertionError("parsed the workbook")
+
+
+def test_workbook_parsed_only_when_it_changes(tmp_path, monkeypatch):
+    path = _workbook(tmp_path)
+    assert RuleSet.load(path)["account_number"].max_length == 20
+    assert rules_cache_path(path).exists()
+    with monkeypatch.context() as patch:
+        patch.setattr(pd, "read_excel", _no_workbook)
+        assert RuleSet.load(path).to_records() == [["account_number", 20, "AlphaNumeric",
+                                                    True, None]]
+        # Touched but unchanged: its hash still matches
+        os.utime(path, ns=(0, 0))
+        assert RuleSet.load(path)["account_number"].max_length == 20
+    _workbook(tmp_path, max_length=30)
+    assert RuleSet.load(path)["account_number"].max_length == 30
+
+
+def test_stale_or_broken_cache_is_rebuilt(tmp_path):
+    path = _workbook(tmp_path)
+    rules_cache_path(path).write_text("{not json")
+    assert RuleSet.load(path)["account_number"].max_length == 20
+    cache = json.loads(rules_cache_path(path).read_text())
+    cache["version"] -= 1
+    rules_cache_path(path).write_text(json.dumps(cache))
+    assert RuleSet.load(path)["account_number"].max_length == 20
+    assert json.loads(rules_cache_path(path).read_text())["version"] == RULES_CACHE_VERSION
+
+
+def test_import_leaves_the_workbook_alone(tmp_path):
+    path = _workbook(tmp_path)
+    RuleSet.load(path)
+    # With the cache current, neither the import nor loading the rules
+    # needs openpyxl
+    script = ("import sys, fscs_validation; "
+              f"fscs_validation.load_rules({str(path)!r}); "
+              "print('openpyxl' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            check=True, cwd=Path(__file__).parent.parent).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,63 @@
+# Tests of the parallel batch runner.
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from fscs_validation import run_directory
+from fscs_validation.rules import RULES_SHEET
+from fscs_validation.runner import run_batch
+
+HERE = Path(__file__).parent
+
+
+def _rules_workbook(tmp_path):
+    path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.read_csv(HERE / "data" / "rules.csv").to_excel(path, sheet_name=RULES_SHEET, index=False)
+    return path
+
+
+def _worker_rules(input_path, rules, output_path):
+    # Stands in for the row count, to tell which rules each worker used
+    return os.getpid(), id(rules)
+
+
+def test_every_file_gets_a_status(tmp_path, capsys):
+    rules_path = _rules_workbook(tmp_path)
+    folder = tmp_path / "in"
+    folder.mkdir()
+    shutil.copy(HERE / "data" / "SCV_0.xlsx", folder)
+    pd.DataFrame({"account_number": ["A1", "A2"]}).to_csv(folder / "SCV_1.csv", index=False)
+    (folder / "SCV_2.xlsx").write_bytes(b"not a workbook")
+    summary = run_directory(str(folder), profile="batch", rules_path=str(rules_path), workers=2)
+    statuses = {Path(status["file"]).name: status for status in summary}
+    assert statuses["SCV_1.csv"]["status"] == "success" and statuses["SCV_1.csv"]["rows"] == 2
+    assert statuses["SCV_0.xlsx"]["status"] == "success" and statuses["SCV_0.xlsx"]["rows"] > 0
+    failed = statuses["SCV_2.xlsx"]
+    assert failed["status"] == "failure" and failed["rows"] is None
+    assert "Traceback" in failed["error"]
+    assert all(status["duration"] >= 0 for status in summary)
+    assert (folder / "SCV_1-result.xlsx").exists()
+    assert not (folder / "SCV_2-result.xlsx").exists()
+    assert "FAILURE" in capsys.readouterr().out
+
+
+def test_rules_compiled_once_per_worker(tmp_path):
+    rules_path = _rules_workbook(tmp_path)
+    jobs = [(f"SCV_{i}.csv", f"SCV_{i}-result.xlsx") for i in range(8)]
+    summary = run_batch(jobs, _worker_rules, str(rules_path), workers=2)
+    assert [status["file"] for status in summary] == [input_path for input_path, _ in jobs]
+    rules_by_worker = {}
+    for status in summary:
+        pid, rules = status["rows"]
+        rules_by_worker.setdefault(pid, set()).add(rules)
+    assert all(len(rules) == 1 for rules in rules_by_worker.values())
+
+
+def test_empty_directory(tmp_path, capsys):
+    rules_path = _rules_workbook(tmp_path)
+    folder = tmp_path / "in"
+    folder.mkdir()
+    assert run_directory(str(folder), rules_path=str(rules_path), workers=1) == []
+    assert "Found 0 files to process" in capsys.readouterr().out
@@ -0,0 +1,73 @@
+# Tests of the validation service, through its own submit() client.
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from fscs_validation.rules import RULES_SHEET
+from fscs_validation.service import ValidationService, submit
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.read_csv(HERE / "data" / "rules.csv").to_excel(path, sheet_name=RULES_SHEET, index=False)
+    return path
+
+
+def _serve(rules_path, tmp_path, test, **options):
+    """Run *test*(socket path) against a service listening on a Unix socket"""
+    async def run():
+        service = ValidationService(rules_path, "batch", **options)
+        unix_path = str(tmp_path / "fscs.sock")
+        servers = await service.start(port=None, unix_path=unix_path)
+        try:
+            return await test(unix_path)
+        finally:
+            for server in servers:
+                server.close()
+            service.close()
+    return asyncio.run(run())
+
+
+async def _collect(file_path, unix_path):
+    return [line async for line in submit(str(file_path), unix_path=unix_path)]
+
+
+def test_errors_stream_back_chunk_by_chunk(rules_path, tmp_path):
+    upload = tmp_path / "SCV_0001.csv"
+    pd.DataFrame({"account_number": ["A1", "A2", "A1", "A2", "A3"],
+                  "surname": ["Smith", "Jones", "Smith", "Jones", "Brown"]}
+                 ).to_csv(upload, index=False)
+    lines = _serve(rules_path, tmp_path, lambda unix_path: _collect(upload, unix_path),
+                   workers=1, chunksize=2)
+
+    *errors, summary = lines
+    duplicates = [(line["row"], line["error"]) for line in errors
+                  if line["column"] == "account_number"]
+    # Rows 2 and 3 repeat accounts from the first chunk
+    assert duplicates == [(2, "Duplicate Account Number"), (3, "Duplicate Account Number")]
+    assert summary["summary"]["records"] == 5
+    assert summary["summary"]["failing_cells"] == len({(e["row"], e["column"]) for e in errors})
+
+
+def test_full_queue_is_refused(rules_path, tmp_path):
+    upload = tmp_path / "SCV_0001.csv"
+    pd.DataFrame({"account_number": ["A1"]}).to_csv(upload, index=False)
+
+    async def test(unix_path):
+        # An upload whose body never arrives holds the only place
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+        writer.write(b"POST /validate?name=held.csv HTTP/1.1\r\nContent-Length: 10\r\n\r\n")
+        await writer.drain()
+        await asyncio.sleep(0.2)
+        try:
+            with pytest.raises(RuntimeError, match="^503"):
+                await _collect(upload, unix_path)
+        finally:
+            writer.close()
+
+    _serve(rules_path, tmp_path, test, workers=1, max_queued=0)
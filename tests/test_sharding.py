@@ -0,0 +1,65 @@
+# Tests of row-sharded validation against a sequential run.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from fscs_validation import RuleSet, validate_columns
+from fscs_validation import sharding
+from fscs_validation.synthetic import generate_frame
+from fscs_validation.writers import result_strings
+
+HERE = Path(__file__).parent
+ROWS = 600
+
+
+def _rules():
+    rules_df = pd.read_csv(HERE / "data" / "rules.csv")
+    # Types the rules sheet declares itself, registered at run time
+    declared = {"account_number": ("ShardAccountNumber", r"\d{8}"),
+                "postcode": ("ShardPostcode", r"[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}")}
+    rules_df["Pattern"] = None
+    for name, (data_type, pattern) in declared.items():
+        row = rules_df["Name in File"] == name
+        rules_df.loc[row, "Type of data"] = data_type
+        rules_df.loc[row, "Pattern"] = pattern
+    return RuleSet.from_frame(rules_df)
+
+
+def _frame():
+    frame = generate_frame(RuleSet.from_frame(pd.read_csv(HERE / "data" / "rules.csv")), ROWS,
+                           error_rate=0.05, duplicate_rate=0.05, seed=6)
+    frame.loc[::37, "account_number"] = "A1"
+    # A customer whose accounts are spread over every shard
+    frame.loc[::150, "single_customer_view_record"] = "C9999999"
+    frame.loc[::150, "account_balance_in_sterling"] = "30000.00"
+    return frame
+
+
+def test_sharded_matches_sequential(monkeypatch):
+    # Spawned workers start from a fresh import, knowing only the built-in
+    # messages
+    monkeypatch.setattr(sharding, "ProcessPoolExecutor",
+                        partial(ProcessPoolExecutor,
+                                mp_context=multiprocessing.get_context("spawn")))
+    monkeypatch.setattr(sharding, "MIN_SHARD_ROWS", 100)
+    rules, frame = _rules(), _frame()
+    sequential = result_strings(validate_columns(frame, rules, "batch2"))
+    sharded = result_strings(sharding.validate_sharded(frame, rules, "batch2", workers=4))
+    pd.testing.assert_frame_equal(sharded, sequential)
+    # The declared types and the cross-row checks both had failures to compare
+    assert sequential["account_number"].str.contains("Invalid ShardAccountNumber").any()
+    assert sequential["account_number"].str.contains("Duplicate Account Number").any()
+    assert sequential["account_balance_in_sterling"].str.contains("Customer balances").any()
+
+
+def test_small_frames_stay_in_process(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("started a pool")
+
+    monkeypatch.setattr(sharding, "ProcessPoolExecutor", no_pool)
+    frame = _frame().head(150)
+    results = sharding.validate_sharded(frame, _rules(), "batch", workers=4)
+    assert len(results) == 150
@@ -0,0 +1,42 @@
+# Tests of the compact storage of records read from a file.
+import pandas as pd
+
+from fscs_validation import RuleSet, iter_chunks
+from fscs_validation.columnar import _text
+from fscs_validation.store import TEXT_DTYPE
+
+
+def _rules():
+    return RuleSet.from_frame(pd.DataFrame(
+        [("account_number", "AlphaNumeric", 20, "No"),
+         ("product_type", "AlphaNumeric", 10, "No")],
+        columns=["Name in File", "Type of data", "Max Number of Characters",
+                 "Mandate or not"]))
+
+
+def test_categories_are_the_same_in_every_chunk(tmp_path):
+    path = tmp_path / "SCV.csv"
+    frame = pd.DataFrame({"account_number": [f"A{i}" for i in range(6)],
+                          "product_type": ["ISA", "ISA", "NA", "FD1", "XYZ", None]})
+    frame.to_csv(path, index=False)
+    chunks = list(iter_chunks(path, _rules(), chunksize=2))
+    assert all(chunk["account_number"].dtype == TEXT_DTYPE for chunk in chunks)
+    types = [chunk["product_type"] for chunk in chunks]
+    assert types[0].dtype == types[1].dtype
+    # A value outside the domain is kept, after the domain
+    assert types[2].tolist()[0] == "XYZ" and pd.isna(types[2].tolist()[1])
+    isa, fd1 = types[0].cat.categories.get_loc("ISA"), types[1].cat.categories.get_loc("FD1")
+    assert types[2].cat.categories.get_loc("ISA") == isa
+    assert types[2].cat.categories.get_loc("FD1") == fd1
+    assert types[0].cat.codes.tolist() == [isa, isa]
+
+
+def test_text_of_every_storage():
+    values = ["ISA", None, "FD1", "ISA"]
+    expected = ["ISA", "", "FD1", "ISA"]
+    for dtype in (TEXT_DTYPE, "category", object):
+        text = _text(pd.Series(values, dtype=dtype))
+        assert text.tolist() == expected and text.dtype == object
+    # Numbers in an object column read as str() did
+    assert _text(pd.Series([90.0, 6, None], dtype=object)).tolist() == ["90.0", "6", ""]
+    assert _text(pd.Series([], dtype="category")).tolist() == []
@@ -0,0 +1,75 @@
+# Tests of the synthetic file generator and the benchmark harness.
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from fscs_validation import RuleSet, benchmark, validate_columns
+from fscs_validation.rules import RULES_SHEET
+from fscs_validation.synthetic import file_name, generate_frame, write_file
+from fscs_validation.writers import result_strings
+
+HERE = Path(__file__).parent
+
+
+def _rules():
+    return RuleSet.from_frame(pd.read_csv(HERE / "data" / "rules.csv"))
+
+
+def _failing(frame, column, message):
+    strings = result_strings(validate_columns(frame, _rules(), "batch"))
+    return int(strings[column].str.contains(message).sum())
+
+
+def test_rates_and_file_kinds():
+    rules = _rules()
+    frame = generate_frame(rules, 2000, error_rate=0.2, duplicate_rate=0.1, seed=3)
+    assert list(frame.columns) == [rule.name for rule in rules]
+    pd.testing.assert_frame_equal(frame, generate_frame(rules, 2000, error_rate=0.2,
+                                                        duplicate_rate=0.1, seed=3))
+    assert 300 < _failing(frame, "email_address", "Invalid Email Format") < 500
+    assert _failing(frame, "account_number", "Duplicate Account Number") > 100
+    exclusions = generate_frame(rules, 100, exclusion=True, error_rate=0, seed=3)
+    assert set(exclusions["product_type"]) == {"Other"}
+    assert exclusions["exclusion_type"].notna().any()
+    assert (file_name(7), file_name(7, True, ".xlsx")) == ("SCV_0007.csv", "EX_0007.xlsx")
+
+
+def test_no_errors_asked_for_none_made():
+    frame = generate_frame(_rules(), 500, error_rate=0, duplicate_rate=0, seed=3)
+    assert _failing(frame, "email_address", "Invalid Email Format") == 0
+    assert _failing(frame, "account_number", "Duplicate Account Number") == 0
+    assert frame["exclusion_type"].isna().all()
+    with pytest.raises(ValueError):
+        write_file(frame, "SCV_0000.json")
+
+
+def test_runs_are_recorded_and_compared(tmp_path, monkeypatch, capsys):
+    rules_path = tmp_path / "fscs_scv_tables.xlsx"
+    pd.read_csv(HERE / "data" / "rules.csv").to_excel(rules_path, sheet_name=RULES_SHEET,
+                                                      index=False)
+    results_path = tmp_path / "benchmark-results.jsonl"
+    # Too many rows for a sheet are skipped as xlsx input, not failed
+    monkeypatch.setattr(benchmark, "EXCEL_MAX_ROWS", 30)
+    argv = ["--rows", "20", "40", "--inputs", "csv", "xlsx", "--outputs", "csv",
+            "--rules", str(rules_path), "--results", str(results_path)]
+    assert benchmark.main(argv) == 0
+    assert "Skipping 40 rows as xlsx input" in capsys.readouterr().out
+    benchmark.main(argv + ["--compare"])
+    assert capsys.readouterr().out.strip() == "Need at least two runs to compare"
+
+    records = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert len(records) == 6
+    assert {(r["rows"], r["file"], r["input"]) for r in records} == {
+        (20, "SCV", "csv"), (20, "EX", "csv"), (20, "SCV", "xlsx"), (20, "EX", "xlsx"),
+        (40, "SCV", "csv"), (40, "EX", "csv")}
+    assert all(r["seconds"] > 0 and "validate" in r["phases"] for r in records)
+    # A second run, under another id, can be compared with the first
+    for record in records:
+        record["run"] = "20000101T000000Z"
+    with open(results_path, "a") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    benchmark.main(argv + ["--compare"])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 7 and lines[1].split()[:5] == ["20", "EX", "csv", "->", "csv"]
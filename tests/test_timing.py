@@ -0,0 +1,35 @@
+# Tests of the timings summary printed after a run.
+import json
+
+from fscs_validation.timing import print_timings
+
+
+def _save(path, column_seconds):
+    path.write_text(json.dumps({
+        "phases": {"validate": sum(column_seconds.values())},
+        "columns": [{"column": column, "seconds": seconds, "failures": 1}
+                    for column, seconds in column_seconds.items()],
+        "rules": [{"column": column, "rule": "Exceeds max length", "seconds": seconds,
+                   "calls": 1, "failures": 1}
+                  for column, seconds in column_seconds.items()],
+    }))
+    return path
+
+
+def test_rules_are_summed_per_column(tmp_path, capsys):
+    paths = [_save(tmp_path / "a.timings.json", {"address_line_1": 3.0, "town": 1.0}),
+             _save(tmp_path / "b.timings.json", {"address_line_1": 2.0}),
+             tmp_path / "missing.timings.json"]
+    print_timings(paths)
+    lines = capsys.readouterr().out.splitlines()
+    rules = [line.split() for line in lines if "Exceeds max length" in line]
+    assert [(row[0], row[-3:]) for row in rules] == [
+        ("address_line_1", ["5.00", "2", "2"]), ("town", ["1.00", "1", "1"])]
+    columns = lines[lines.index(next(line for line in lines if line.startswith("Column"))) + 1:]
+    assert columns[0].split() == ["address_line_1", "5.00", "2"]
+    assert columns[1].split() == ["town", "1.00", "1"]
+
+
+def test_nothing_printed_without_timings(tmp_path, capsys):
+    print_timings([tmp_path / "missing.timings.json"])
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,33 @@
+# Tests of the watch-folder manifest.
+from fscs_validation.rules import file_digest
+from fscs_validation.watcher import FolderWatcher
+
+STATUS = {"file": "SCV_0001.csv", "output": "SCV_0001-result.xlsx", "rows": 1}
+
+
+def _queued(input_dir, profile, rules_path):
+    output_dir = input_dir.parent / "results"
+    output_dir.mkdir(exist_ok=True)
+    watcher = FolderWatcher(str(input_dir), str(output_dir), profile, str(rules_path),
+                            workers=1, settle=0)
+    watcher.rules_digest = file_digest(rules_path)
+    watcher.scan(now=0)
+    watcher.scan(now=1)
+    return watcher, list(watcher._ready)
+
+
+def test_manifest_keyed_on_file_profile_and_rules(tmp_path):
+    input_dir, rules_path = tmp_path / "in", tmp_path / "rules.xlsx"
+    input_dir.mkdir()
+    (input_dir / "SCV_0001.csv").write_text("account_number\nA1\n")
+    rules_path.write_bytes(b"rules v1")
+
+    watcher, queued = _queued(input_dir, "batch2", rules_path)
+    [(path, key)] = queued
+    assert key == (file_digest(path), "batch2", file_digest(rules_path))
+    watcher.manifest.add(key, STATUS)
+
+    assert _queued(input_dir, "batch2", rules_path)[1] == []
+    assert len(_queued(input_dir, "batch", rules_path)[1]) == 1
+    rules_path.write_bytes(b"rules v2")
+    assert len(_queued(input_dir, "batch2", rules_path)[1]) == 1
@@ -0,0 +1,39 @@
+# Tests of the output layouts and sinks.
+import pandas as pd
+import pytest
+
+from fscs_validation.writers import ExcelSink, open_sink
+
+SUFFIXES = (".csv", ".parquet", ".xlsx")
+FRAME = pd.DataFrame({"account_number": ["A1", "A2"], "result": ["Pass", "Fail - x"]})
+
+
+def _sinks(path):
+    yield open_sink(path)
+    if path.suffix == ".xlsx":
+        yield ExcelSink(path)
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_sink_renames_finished_output(tmp_path, suffix):
+    path = tmp_path / f"result{suffix}"
+    for sink in _sinks(path):
+        with sink:
+            sink.write(FRAME)
+            assert not path.exists()
+        assert path.exists()
+        assert not sink.partial_path.exists()
+        path.unlink()
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_sink_removes_partial_output_on_error(tmp_path, suffix):
+    path = tmp_path / f"result{suffix}"
+    path.write_bytes(b"earlier result")
+    for sink in _sinks(path):
+        with pytest.raises(RuntimeError):
+            with sink:
+                sink.write(FRAME)
+                raise RuntimeError("validation failed")
+        assert not sink.partial_path.exists()
+        assert path.read_bytes() == b"earlier result"